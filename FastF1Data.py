@@ -1,30 +1,50 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import fastf1
 import pandas as pd
 
 years = [2023, 2024, 2025]
-all_results = []
+MAX_WORKERS = 8
+
+# Enable the on-disk cache before spawning workers so every thread shares it
+os.makedirs('f1_cache', exist_ok=True)
+fastf1.Cache.enable_cache('f1_cache')
+
+
+def load_race_results(task):
+    year, round_number = task
+    try:
+        session = fastf1.get_session(year, round_number, 'R')
+        session.load()
+        # session.results is a fresh frame per session, so tag it in place
+        results = session.results
+        results['Season'] = year
+        results['RoundNumber'] = round_number
+        return results
+    except Exception as e:
+        print(f"Skipping round {round_number} {year} due to error: {e}")
+        return None
 
+
+# Flatten the schedule into (season, round) tasks
+tasks = []
 for year in years:
     try:
         schedule = fastf1.get_event_schedule(year)
     except Exception as e:
         print(f"Failed to load schedule data for {year}: {e}")
         continue
-    for _, race in schedule.iterrows():
-        try:
-            session = fastf1.get_session(year, race['RoundNumber'], 'R')
-            session.load()
-            results = session.results.copy()
-            results['Season'] = year
-            results['RoundNumber'] = race['RoundNumber']
-            all_results.append(results)
-        except Exception as e:
-            print(f"Skipping round {race['RoundNumber']} {year} due to error: {e}")
+    tasks.extend((year, rnd) for rnd in schedule['RoundNumber'])
+
+# Session loading is I/O-bound, so overlap it with a thread pool
+with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+    all_results = [r for r in executor.map(load_race_results, tasks) if r is not None]
 
 # Combine all results into one DataFrame
 if all_results:
-    combined_results = pd.concat(all_results, ignore_index=True)
+    combined_results = pd.concat(all_results, ignore_index=True, copy=False)
     combined_results.to_csv('race_results_2023_2024_2025.csv', index=False)
     print("CSV file saved as race_results_2023_2024_2025.csv")
 else:
-    print("No race results collected.")
\ No newline at end of file
+    print("No race results collected.")
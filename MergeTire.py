@@ -1,79 +1,75 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import fastf1
 
+from utils import load_laps, read_table, write_csv
+
+# Runs at import time, so every worker process reuses the same disk cache
 fastf1.Cache.enable_cache("f1_cache")  # wherever you want the cache
 
+COMPOUNDS = ['SOFT', 'MEDIUM', 'HARD', 'INTERMEDIATE', 'WET']
+
 def tire_proportions_for_race(season: int, round_number: int) -> pd.DataFrame:
     """
     Compute per-driver proportion of laps on each compound for a single race.
     Returns columns: Season, Round, Driver, SOFT, MEDIUM, HARD, INTERMEDIATE, WET
     """
     try:
-        session = fastf1.get_session(season, round_number, 'R')
-        session.load()  # populates session.laps
-        laps = session.laps
+        laps = load_laps(season, round_number)
 
         if laps.empty:
             return pd.DataFrame()
 
-        # Build stint lengths the documented way:
-        # group by Driver, Stint, Compound and count laps in each stint
-        stint_lengths = (
-            laps[['Driver', 'Stint', 'Compound', 'LapNumber']]
-            .dropna(subset=['Stint', 'Compound'])
-            .groupby(['Driver', 'Stint', 'Compound'], as_index=False)['LapNumber']
-            .count()
-            .rename(columns={'LapNumber': 'StintLength'})
-        )
-
-        # Sum across multiple stints of the same compound (e.g., two Medium stints)
-        comp_lengths = (
-            stint_lengths
-            .groupby(['Driver', 'Compound'], as_index=False)['StintLength']
-            .sum()
-        )
-
-        # Total laps per driver (DNFs will just have fewer laps, which is fine)
-        totals = (
-            comp_lengths.groupby('Driver', as_index=False)['StintLength']
-            .sum()
-            .rename(columns={'StintLength': 'TotalLaps'})
-        )
-
-        comp_lengths = comp_lengths.merge(totals, on='Driver', how='left')
-        comp_lengths['Proportion'] = comp_lengths['StintLength'] / comp_lengths['TotalLaps']
-
-        # Pivot to columns per compound
-        tire_df = comp_lengths.pivot(index='Driver', columns='Compound', values='Proportion').reset_index()
-
-        # Ensure a consistent set of columns, fill missing with 0
-        for comp in ['SOFT', 'MEDIUM', 'HARD', 'INTERMEDIATE', 'WET']:
-            if comp not in tire_df.columns:
-                tire_df[comp] = 0.0
-        tire_df = tire_df[['Driver', 'SOFT', 'MEDIUM', 'HARD', 'INTERMEDIATE', 'WET']].fillna(0.0)
+        laps = laps[['Driver', 'Stint', 'Compound', 'LapNumber']].dropna(subset=['Stint', 'Compound', 'LapNumber'])
+
+        # Categorical compounds (known ones first) make unstack emit every
+        # compound column in order, so no reindex/fill step is needed
+        other = sorted(set(laps['Compound']) - set(COMPOUNDS))
+        laps = laps.assign(Compound=laps['Compound'].astype(pd.CategoricalDtype(COMPOUNDS + other)))
+
+        # Laps per (Driver, Compound) in one pass; summing stints of the same
+        # compound (e.g. two Medium stints) falls out of the count directly
+        comp_lengths = laps.groupby(['Driver', 'Compound'], observed=False).size().unstack(fill_value=0)
+
+        # Normalize by total laps per driver (DNFs will just have fewer laps, which is fine);
+        # laps on unlisted compounds still count toward the total
+        tire_df = comp_lengths.div(comp_lengths.sum(axis=1), axis=0)[COMPOUNDS]
+        tire_df.columns = list(COMPOUNDS)
+        tire_df = tire_df.reset_index()
 
         tire_df['Season'] = season
         tire_df['Round'] = round_number
 
-        return tire_df[['Season', 'Round', 'Driver', 'SOFT', 'MEDIUM', 'HARD', 'INTERMEDIATE', 'WET']]
+        return tire_df[['Season', 'Round', 'Driver'] + COMPOUNDS]
 
     except Exception as e:
         print(f"Failed {season} Round {round_number}: {e}")
         return pd.DataFrame()
 
+def _tire_one(task):
+    """
+    Process-pool entry point: unpack a (season, round) task.
+
+    The worker loads laps itself (writing the parquet cache via load_laps) and
+    sends back only the ~20-row per-driver proportions, never the raw laps.
+    """
+    season, round_number = task
+    return tire_proportions_for_race(season, round_number)
+
+
 def append_tire_data(main_df: pd.DataFrame) -> pd.DataFrame:
     """
     Loop over unique (Season, Round) pairs in main_df,
     compute tire proportions, and merge back on Abbreviation ↔ Driver.
     """
-    out = []
     races = main_df[['Season', 'Round']].drop_duplicates()
+    tasks = [(int(r['Season']), int(r['Round'])) for _, r in races.iterrows()]
 
-    for _, r in races.iterrows():
-        season, rnd = int(r['Season']), int(r['Round'])
-        tp = tire_proportions_for_race(season, rnd)
-        if not tp.empty:
-            out.append(tp)
+    # Each race does a load plus a groupby/pivot; processes avoid GIL contention
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        out = [tp for tp in ex.map(_tire_one, tasks) if not tp.empty]
 
     if not out:
         return main_df.copy()
@@ -88,13 +84,14 @@ def append_tire_data(main_df: pd.DataFrame) -> pd.DataFrame:
     )
 
     # If a driver/race didn’t load, fill proportions with 0 so models don’t crash
-    for comp in ['SOFT', 'MEDIUM', 'HARD', 'INTERMEDIATE', 'WET']:
+    for comp in COMPOUNDS:
         if comp in merged.columns:
             merged[comp] = merged[comp].fillna(0.0)
 
     return merged
 
-# Example usage with your uploaded CSV
-df = pd.read_csv("Processed_F1_Results.csv")
-final_df = append_tire_data(df)
-final_df.to_csv("F1_with_TireProportions.csv", index=False)
+if __name__ == "__main__":
+    # Example usage with your uploaded CSV (guarded so worker processes skip it)
+    df = read_table("Processed_F1_Results.csv")
+    final_df = append_tire_data(df)
+    write_csv(final_df, "F1_with_TireProportions.csv")
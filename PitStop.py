@@ -1,45 +1,41 @@
 import fastf1
 import pandas as pd
 
+from utils import load_laps, read_table, write_table
+
 # Enable caching so sessions load faster after first call
 fastf1.Cache.enable_cache('f1_cache')
 
 # Load your race results
-df_results = pd.read_csv('race_results_2023_2024_2025.csv')
+df_results = read_table('race_results_2023_2024_2025.csv')
+
 
-def get_avg_pitstop_time(season, round_number, driver_abbr, driver_number):
+def get_avg_pitstop_times(season, round_number, group):
+    """Average PitTime for every driver row of one race, aligned to group.index."""
     try:
-        # Load the race session
-        session = fastf1.get_session(int(season), int(round_number), 'R')
-        session.load()
-        
-        laps = session.laps
+        laps = load_laps(int(season), int(round_number))
+        pit_laps = laps.dropna(subset=['PitTime'])
 
         # First try by Abbreviation
-        pitstops = laps[laps['Driver'] == driver_abbr]['PitTime']
-        
-        # If empty, fall back to DriverNumber
-        if pitstops.empty and 'DriverNumber' in laps.columns:
-            pitstops = laps[laps['DriverNumber'] == str(driver_number)]['PitTime']
-        
-        # Return mean if valid
-        if pitstops.notnull().any():
-            return float(pitstops.mean())
-        else:
-            return None
+        avg = group['Abbreviation'].map(pit_laps.groupby('Driver')['PitTime'].mean())
+
+        # If missing, fall back to DriverNumber
+        if 'DriverNumber' in laps.columns:
+            by_number = pit_laps.groupby('DriverNumber')['PitTime'].mean()
+            avg = avg.fillna(group['DriverNumber'].astype(str).map(by_number))
+
+        return avg
     except Exception as e:
-        print(f"Error for {season} round {round_number} driver {driver_abbr}: {e}")
-        return None
-
-# Compute average pit stop time for each row
-df_results['AvgPitStopTime'] = df_results.apply(
-    lambda row: get_avg_pitstop_time(
-        row['Season'], 
-        row['RoundNumber'], 
-        row['Abbreviation'], 
-        row['DriverNumber']
-    ), axis=1
-)
-
-# Save updated CSV
-df_results.to_csv('race_results_2023_2024_2025_with_pitstops.csv', index=False)
\ No newline at end of file
+        print(f"Error for {season} round {round_number}: {e}")
+        return pd.Series(None, index=group.index, dtype=object)
+
+
+# Compute average pit stop time per race, loading each session only once
+parts = [
+    get_avg_pitstop_times(season, rnd, grp)
+    for (season, rnd), grp in df_results.groupby(['Season', 'RoundNumber'])
+]
+df_results['AvgPitStopTime'] = pd.concat(parts) if parts else None
+
+# Save updated CSV (plus a parquet copy that merge_f1_data.py reads first)
+write_table(df_results, 'race_results_2023_2024_2025_with_pitstops.csv')
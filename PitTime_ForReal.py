@@ -1,6 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import fastf1
 import pandas as pd
 
+MAX_WORKERS = 8
+
 # Enable caching to avoid re-downloading
 fastf1.Cache.enable_cache("f1_cache")
 
@@ -37,11 +41,16 @@ def get_driver_avg_quali_times(season, round_number):
         return []
 
 # Collect results for 2023–2025
-all_results = []
+tasks = []
 for season in [2023, 2024, 2025]:
     schedule = fastf1.get_event_schedule(season)
-    for rnd in schedule['RoundNumber']:
-        all_results.extend(get_driver_avg_quali_times(season, rnd))
+    tasks.extend((season, rnd) for rnd in schedule['RoundNumber'])
+
+# Sessions load independently, so fetch them concurrently
+all_results = []
+with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+    for rows in executor.map(lambda t: get_driver_avg_quali_times(*t), tasks):
+        all_results.extend(rows)
 
 df = pd.DataFrame(all_results)
 
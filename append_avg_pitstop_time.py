@@ -25,12 +25,19 @@ except Exception as e:
     print("fastf1 is required. Install with: pip install fastf1")
     raise
 import difflib
+import unicodedata
+import queue
+import threading
 from tqdm import tqdm
 
+from utils import read_laps, read_table, write_csv
+
 
 CSV_PATH = "premodeldatav1.csv"
 CACHE_DIR = "f1_cache"
 AVG_COL = "AvgPitStopTime"
+LOADER_THREADS = 4
+QUEUE_SIZE = 4
 
 
 def detect_column(df, candidates):
@@ -47,6 +54,259 @@ def safe_int(x):
         return None
 
 
+def load_race(season, rnd):
+    """Load stage: return (session, laps) for one race, or None if it cannot be loaded."""
+    try:
+        print(f"Loading session Season={season} Round={rnd} ...")
+        session = fastf1.get_session(season, rnd, 'R')
+        # each race is loaded once here, so use the uncached reader (the parquet
+        # cache still applies); cached laps would stay resident and the bounded
+        # queues in iter_pit_maps would not cap memory
+        laps = read_laps(season, rnd)
+    except Exception as e:
+        print(f"Could not load session Season={season} Round={rnd}: {e}")
+        # leave values as NaN for this session
+        return None
+    return session, laps
+
+
+def build_pit_map(session, laps):
+    """Transform stage: return the driver -> average pit time mapping for one race.
+
+    Keys are upper-cased driver ids and stringified driver numbers.
+    """
+    # Build pit stop mapping. Prefer explicit PitTime when available.
+    pit_map = {}
+
+    # Helper to store mapping for several key formats (driver id, driver number)
+    def store_keys(drv_key, drv_num, val):
+        try:
+            if drv_key is not None:
+                pit_map[str(drv_key).upper()] = float(val)
+        except Exception:
+            pass
+        try:
+            if drv_num is not None and not (pd.isna(drv_num)):
+                pit_map[str(int(drv_num))] = float(val)
+        except Exception:
+            pass
+
+    if 'PitTime' in laps.columns and laps['PitTime'].notna().any():
+        grouped = laps[laps['PitTime'].notna()].groupby('Driver')['PitTime'].mean()
+        for drv, val in grouped.items():
+            # store by Driver (usually string id) and by DriverNumber if present on rows
+            # find a representative driver number for this driver id
+            try:
+                rep = laps.loc[laps['Driver'] == drv, 'DriverNumber'].dropna().astype(int)
+                repnum = int(rep.iloc[0]) if len(rep) else None
+            except Exception:
+                repnum = None
+            store_keys(drv, repnum, val)
+
+    else:
+        # Try computing pit stop durations from PitInTime and PitOutTime
+        if 'PitInTime' in laps.columns and 'PitOutTime' in laps.columns:
+            try:
+                pit_df = laps[laps['PitInTime'].notna() & laps['PitOutTime'].notna()]
+                # FastF1 always returns PitIn/Out as timedelta64; subtract the int64 ns views directly
+                pit_in = pit_df['PitInTime'].to_numpy(dtype='timedelta64[ns]').view('int64')
+                pit_out = pit_df['PitOutTime'].to_numpy(dtype='timedelta64[ns]').view('int64')
+                pit_df = pit_df.assign(StopSeconds=(pit_out - pit_in) / 1e9)
+
+                if pit_df['StopSeconds'].notna().any():
+                    # group by DriverNumber where possible, and by Driver
+                    if 'DriverNumber' in pit_df.columns:
+                        try:
+                            gnum = pit_df.groupby('DriverNumber')['StopSeconds'].mean()
+                            for drvnum, val in gnum.items():
+                                store_keys(None, drvnum, val)
+                        except Exception:
+                            pass
+                    try:
+                        g = pit_df.groupby('Driver')['StopSeconds'].mean()
+                        for drv, val in g.items():
+                            # representative driver number
+                            try:
+                                rep = pit_df.loc[pit_df['Driver'] == drv, 'DriverNumber'].dropna().astype(int)
+                                repnum = int(rep.iloc[0]) if len(rep) else None
+                            except Exception:
+                                repnum = None
+                            store_keys(drv, repnum, val)
+                    except Exception:
+                        pass
+            except Exception:
+                # ignore and continue to other fallbacks
+                pass
+
+    # Fallback: sometimes pit stop info is stored in session.pit_stops (DataFrame-like).
+    # The session is only created in load_race, so load it now that it is needed.
+    if not pit_map:
+        try:
+            session.load(telemetry=False, weather=False, messages=False)
+        except Exception as e:
+            print(f"Could not load session for pit_stops fallback: {e}")
+    if not pit_map and hasattr(session, 'pit_stops'):
+        try:
+            pst = session.pit_stops
+            if hasattr(pst, 'groupby'):
+                if 'StopTime' in pst.columns:
+                    grouped = pst.groupby('Driver')['StopTime'].mean()
+                    for drv, val in grouped.items():
+                        # try to find driver number in pst
+                        try:
+                            rep = pst.loc[pst['Driver'] == drv, 'DriverNumber'].dropna().astype(int)
+                            repnum = int(rep.iloc[0]) if len(rep) else None
+                        except Exception:
+                            repnum = None
+                        store_keys(drv, repnum, val)
+                # sometimes column names differ
+                elif 'Duration' in pst.columns:
+                    grouped = pst.groupby('Driver')['Duration'].mean()
+                    for drv, val in grouped.items():
+                        store_keys(drv, None, val)
+        except Exception:
+            pass
+
+    return pit_map
+
+
+def iter_pit_maps(tasks, n_loaders=LOADER_THREADS, maxsize=QUEUE_SIZE):
+    """Yield (season, rnd, pit_map) for each task as it completes.
+
+    Runs a three-stage pipeline: n_loaders threads call load_race and feed a
+    bounded queue, one transform thread turns laps into pit maps, and the
+    caller drains the results. The bounded queues cap how many loaded
+    sessions are held in memory at once. pit_map is None for sessions that
+    failed to load or transform.
+    """
+    q_tasks = queue.Queue()
+    for task in tasks:
+        q_tasks.put(task)
+    q_raw = queue.Queue(maxsize=maxsize)
+    q_out = queue.Queue(maxsize=maxsize)
+    done = object()
+
+    def loader():
+        while True:
+            try:
+                season, rnd = q_tasks.get_nowait()
+            except queue.Empty:
+                break
+            q_raw.put((season, rnd, load_race(season, rnd)))
+        q_raw.put(done)
+
+    def transformer():
+        finished = 0
+        while finished < n_loaders:
+            item = q_raw.get()
+            if item is done:
+                finished += 1
+                continue
+            season, rnd, loaded = item
+            pit_map = None
+            if loaded is not None:
+                try:
+                    pit_map = build_pit_map(*loaded)
+                except Exception as e:
+                    print(f"Could not build pit map for Season={season} Round={rnd}: {e}")
+            q_out.put((season, rnd, pit_map))
+        q_out.put(done)
+
+    threads = [threading.Thread(target=loader, daemon=True) for _ in range(n_loaders)]
+    threads.append(threading.Thread(target=transformer, daemon=True))
+    for th in threads:
+        th.start()
+
+    while True:
+        item = q_out.get()
+        if item is done:
+            break
+        yield item
+
+    for th in threads:
+        th.join()
+
+
+def _normalize_name(name):
+    # strip accents so e.g. "PÉREZ" and "PEREZ" share a key
+    return unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode().upper()
+
+
+def build_alias_map(pit_map):
+    """Expand the name keys of pit_map with accent-free and 3-letter variants.
+
+    Built once per session so row matching is plain dict lookups instead of a
+    fuzzy search per row. Exact keys always win over derived aliases.
+    """
+    alias_map = dict(pit_map)
+    for key, val in pit_map.items():
+        if key.isdigit():
+            continue
+        norm = _normalize_name(key)
+        for alias in (norm, key[:3], norm[:3]):
+            alias_map.setdefault(alias, val)
+    return alias_map
+
+
+def match_driver_name(name, alias_map, keys):
+    """Resolve a CSV driver name to a pit time, or None.
+
+    Tries exact/alias lookups (full name, first and last 3 chars) and only
+    falls back to fuzzy matching against `keys` when those all miss.
+    """
+    for v_up in dict.fromkeys((name.upper(), _normalize_name(name))):
+        for cand in (v_up, v_up[:3], v_up[-3:]):
+            if cand in alias_map:
+                return alias_map[cand]
+    if not keys:
+        return None
+    v_up = _normalize_name(name)
+    matches = difflib.get_close_matches(v_up, keys, n=1, cutoff=0.6)
+    return alias_map[matches[0]] if matches else None
+
+
+def apply_pit_map(df, rows, pit_map, driver_col, driver_number_col):
+    """Write pit_map values into AVG_COL for the index labels in rows.
+
+    Matches by driver number first when the CSV has one, then falls back to
+    name-based heuristics (exact, 3-letter fragments, fuzzy). Name matching
+    runs once per unique name and the results are mapped back column-wise.
+    """
+    alias_map = build_alias_map(pit_map)
+    keys = tuple(k for k in alias_map if not k.isdigit())
+    name_map = {k: alias_map[k] for k in keys}
+    num_map = {k: v for k, v in pit_map.items() if k.isdigit()}
+    sub = df.loc[rows]
+    # Arrow-backed strings keep upper/strip in C++ kernels instead of per-row Python
+    names = sub[driver_col].astype('string[pyarrow]')
+
+    if driver_number_col is not None:
+        # match via driver number first
+        nums = np.trunc(pd.to_numeric(sub[driver_number_col], errors='coerce'))
+        vals = nums.astype('Int64').astype(str).map(num_map)
+        # then exact upper-cased name, then heuristics once per unique leftover name
+        vals = vals.fillna(names.str.upper().map(name_map))
+        todo = names[vals.isna()].dropna().unique()
+        resolved = {n: match_driver_name(n, alias_map, keys) for n in todo if n}
+        vals = vals.fillna(names.map(resolved))
+    else:
+        # no driver number column, use name heuristics
+        names = names.fillna('').str.strip()
+
+        def resolve(key):
+            chosen = match_driver_name(key, alias_map, keys)
+            if chosen is None:
+                num = safe_int(key)
+                if num is not None:
+                    chosen = num_map.get(str(num))
+            return chosen
+
+        resolved = {n: resolve(n) for n in names.unique() if n}
+        vals = names.map(resolved)
+
+    df.loc[rows, AVG_COL] = vals.astype(float)
+
+
 def main():
     # allow overriding CSV path via CLI
     csv_path = sys.argv[1] if len(sys.argv) > 1 else CSV_PATH
@@ -56,7 +316,7 @@ def main():
         sys.exit(1)
 
     # load
-    df = pd.read_csv(csv_path)
+    df = read_table(csv_path)
 
     # detect columns
     season_col = detect_column(df, ["Season", "season", "Year", "year"])
@@ -76,187 +336,42 @@ def main():
     if AVG_COL not in df.columns:
         df[AVG_COL] = np.nan
 
+    # Prefer to match by DriverNumber column in CSV when available
+    driver_number_col = detect_column(df, ['DriverNumber', 'driver_number', 'Number'])
+
     # Build per-session mapping so we only load a session once
     sessions = df[[season_col, round_col]].drop_duplicates()
 
     # normalize names for mapping
     sessions = sessions.dropna()
 
-    # iterate sessions
-    for _, srow in tqdm(sessions.iterrows(), total=len(sessions), desc='Sessions'):
+    # Row positions per (season, round), built once so each session is a dict
+    # lookup instead of two full-column casts and compares
+    groups = df.groupby(
+        [pd.to_numeric(df[season_col], errors='coerce'), pd.to_numeric(df[round_col], errors='coerce')],
+        sort=False,
+    ).indices
+
+    # iterate sessions; loading is I/O-bound so it overlaps with the pit-map transform
+    tasks = []
+    for _, srow in sessions.iterrows():
         season = safe_int(srow[season_col])
         rnd = safe_int(srow[round_col])
         if season is None or rnd is None:
             print(f"Skipping session with bad season/round: {srow.to_dict()}")
             continue
+        tasks.append((season, rnd))
 
-        mask = (df[season_col].astype(float) == float(season)) & (df[round_col].astype(float) == float(rnd))
-
-        try:
-            print(f"Loading session Season={season} Round={rnd} ...")
-            session = fastf1.get_session(season, rnd, 'R')
-            session.load()
-            laps = session.laps
-        except Exception as e:
-            print(f"Could not load session Season={season} Round={rnd}: {e}")
-            # leave values as NaN for this session
+    for season, rnd, pit_map in tqdm(iter_pit_maps(tasks), total=len(tasks), desc='Sessions'):
+        if pit_map is None:
             continue
 
-        # Build pit stop mapping. Prefer explicit PitTime when available.
-        pit_map = {}
-
-        # Helper to store mapping for several key formats (driver id, driver number)
-        def store_keys(drv_key, drv_num, val):
-            try:
-                if drv_key is not None:
-                    pit_map[str(drv_key).upper()] = float(val)
-            except Exception:
-                pass
-            try:
-                if drv_num is not None and not (pd.isna(drv_num)):
-                    pit_map[str(int(drv_num))] = float(val)
-            except Exception:
-                pass
-
-        if 'PitTime' in laps.columns and laps['PitTime'].notna().any():
-            grouped = laps[laps['PitTime'].notna()].groupby('Driver')['PitTime'].mean()
-            for drv, val in grouped.items():
-                # store by Driver (usually string id) and by DriverNumber if present on rows
-                # find a representative driver number for this driver id
-                try:
-                    rep = laps.loc[laps['Driver'] == drv, 'DriverNumber'].dropna().astype(int)
-                    repnum = int(rep.iloc[0]) if len(rep) else None
-                except Exception:
-                    repnum = None
-                store_keys(drv, repnum, val)
-
-        else:
-            # Try computing pit stop durations from PitInTime and PitOutTime
-            if 'PitInTime' in laps.columns and 'PitOutTime' in laps.columns:
-                try:
-                    pit_df = laps[laps['PitInTime'].notna() & laps['PitOutTime'].notna()].copy()
-                    # PitIn/Out may be timedelta or datetime-like. Handle both.
-                    if pd.api.types.is_timedelta64_dtype(pit_df['PitInTime'].dtype) or pd.api.types.is_timedelta64_dtype(pit_df['PitOutTime'].dtype):
-                        pit_df['StopSeconds'] = (pit_df['PitOutTime'] - pit_df['PitInTime']).dt.total_seconds()
-                    else:
-                        # convert to datetimes if not already
-                        pit_df['PitInTime_dt'] = pd.to_datetime(pit_df['PitInTime'])
-                        pit_df['PitOutTime_dt'] = pd.to_datetime(pit_df['PitOutTime'])
-                        pit_df['StopSeconds'] = (pit_df['PitOutTime_dt'] - pit_df['PitInTime_dt']).dt.total_seconds()
-
-                    if pit_df['StopSeconds'].notna().any():
-                        # group by DriverNumber where possible, and by Driver
-                        if 'DriverNumber' in pit_df.columns:
-                            try:
-                                gnum = pit_df.groupby('DriverNumber')['StopSeconds'].mean()
-                                for drvnum, val in gnum.items():
-                                    store_keys(None, drvnum, val)
-                            except Exception:
-                                pass
-                        try:
-                            g = pit_df.groupby('Driver')['StopSeconds'].mean()
-                            for drv, val in g.items():
-                                # representative driver number
-                                try:
-                                    rep = pit_df.loc[pit_df['Driver'] == drv, 'DriverNumber'].dropna().astype(int)
-                                    repnum = int(rep.iloc[0]) if len(rep) else None
-                                except Exception:
-                                    repnum = None
-                                store_keys(drv, repnum, val)
-                        except Exception:
-                            pass
-                except Exception:
-                    # ignore and continue to other fallbacks
-                    pass
-
-        # Fallback: sometimes pit stop info is stored in session.pit_stops (DataFrame-like)
-        if not pit_map and hasattr(session, 'pit_stops'):
-            try:
-                pst = session.pit_stops
-                if hasattr(pst, 'groupby'):
-                    if 'StopTime' in pst.columns:
-                        grouped = pst.groupby('Driver')['StopTime'].mean()
-                        for drv, val in grouped.items():
-                            # try to find driver number in pst
-                            try:
-                                rep = pst.loc[pst['Driver'] == drv, 'DriverNumber'].dropna().astype(int)
-                                repnum = int(rep.iloc[0]) if len(rep) else None
-                            except Exception:
-                                repnum = None
-                            store_keys(drv, repnum, val)
-                    # sometimes column names differ
-                    elif 'Duration' in pst.columns:
-                        grouped = pst.groupby('Driver')['Duration'].mean()
-                        for drv, val in grouped.items():
-                            store_keys(drv, None, val)
-            except Exception:
-                pass
+        positions = groups.get((season, rnd))
+        if positions is None:
+            continue
 
         # Now apply mapping to rows for this session
-        # Prefer to match by DriverNumber column in CSV when available
-        driver_number_col = detect_column(df, ['DriverNumber', 'driver_number', 'Number'])
-
-        if driver_number_col is not None:
-            # match via driver number first
-            for idx in df.loc[mask].index:
-                try:
-                    drvnum = safe_int(df.at[idx, driver_number_col])
-                    if drvnum is not None and str(int(drvnum)) in pit_map:
-                        df.at[idx, AVG_COL] = pit_map[str(int(drvnum))]
-                    else:
-                        # fallback to name-based matching
-                        val = str(df.at[idx, driver_col]) if driver_col in df.columns else ''
-                        chosen = None
-                        if val:
-                            v_up = val.upper()
-                            if v_up in pit_map:
-                                chosen = pit_map[v_up]
-                            else:
-                                # fuzzy match against pit_map keys
-                                keys = list(pit_map.keys())
-                                matches = difflib.get_close_matches(v_up, keys, n=1, cutoff=0.6)
-                                if matches:
-                                    chosen = pit_map[matches[0]]
-                        # if still not found, try fragments (first/last 3 chars)
-                        if chosen is None and val:
-                            v_up = val.upper()
-                            frags = [v_up[:3], v_up[-3:]]
-                            for f in frags:
-                                if f in pit_map:
-                                    chosen = pit_map[f]
-                                    break
-                        df.at[idx, AVG_COL] = chosen if chosen is not None else np.nan
-                except Exception:
-                    df.at[idx, AVG_COL] = np.nan
-        else:
-            # no driver number column, use name heuristics
-            possible_driver_values = df.loc[mask, driver_col].fillna('').astype(str)
-            for idx, drv_val in possible_driver_values.items():
-                key = drv_val.strip()
-                chosen = None
-                if key:
-                    key_upper = key.upper()
-                    if key_upper in pit_map:
-                        chosen = pit_map[key_upper]
-                    else:
-                        # try fragments
-                        if len(key_upper) >= 3:
-                            candidates = [key_upper, key_upper[:3], key_upper[-3:]]
-                            for cand in candidates:
-                                if cand in pit_map:
-                                    chosen = pit_map[cand]
-                                    break
-                        # fuzzy match as fallback
-                        if chosen is None:
-                            matches = difflib.get_close_matches(key_upper, list(pit_map.keys()), n=1, cutoff=0.6)
-                            if matches:
-                                chosen = pit_map[matches[0]]
-                        if chosen is None:
-                            num = safe_int(key)
-                            if num is not None and str(int(num)) in pit_map:
-                                chosen = pit_map[str(int(num))]
-
-                df.at[idx, AVG_COL] = chosen if chosen is not None else np.nan
+        apply_pit_map(df, df.index[positions], pit_map, driver_col, driver_number_col)
 
         if not pit_map:
             print(f"Warning: no pit stop mapping found for Season={season} Round={rnd}")
@@ -278,7 +393,7 @@ def main():
         print("Could not create backup; writing in place")
 
     # save back (only modifies/creates AvgPitStopTime column)
-    df.to_csv(csv_path, index=False)
+    write_csv(df, csv_path)
     print(f"Done — appended column '{AVG_COL}' to {csv_path}")
 
 
@@ -9,8 +9,11 @@ Behavior:
 - If `artifacts/ensemble_fold_models/` exists, loads each fold model and averages their predictions.
 - Otherwise falls back to `artifacts/xgb_minimal_cv_randomized.joblib` or `artifacts/xgb_minimal.joblib`.
 - If `artifacts/linear_calibration.joblib` exists it is applied to the averaged predictions.
+- Loaded artifacts are cached at module level, so importing `score()` (e.g. from serve/app.py)
+  reuses the same pipeline/models across calls instead of unpickling them each time.
 
-Produces: CSV with columns [index, prediction].
+Produces: CSV with columns [index, prediction]; `score()` also returns that DataFrame.
+The uncalibrated predictions and metrics CSVs go to `--output-dir` (default `artifacts/`).
 
 """
 import argparse
@@ -22,10 +25,15 @@ import pandas as pd
 import numpy as np
 import xgboost as xgb
 import json
+import threading
 
 ROOT = Path(__file__).resolve().parents[1]
 ARTIFACTS = ROOT / "artifacts"
 
+# (preprocessor, models, calibrator) loaded once per process; see load_resources()
+_RESOURCES = None
+_init_lock = threading.Lock()
+
 
 def load_preprocessor():
     p = ARTIFACTS / "preprocessing_pipeline.joblib"
@@ -54,18 +62,51 @@ def load_ensemble_models():
     raise FileNotFoundError("No model artifacts found in artifacts/ (searched ensemble folder and fallback models)")
 
 
-def apply_calibration(preds: np.ndarray) -> np.ndarray:
+def load_calibration():
     calib_path = ARTIFACTS / "linear_calibration.joblib"
     if calib_path.exists():
-        lr = joblib.load(calib_path)
+        return joblib.load(calib_path)
+    return None
+
+
+def load_resources():
+    """Return the cached (preprocessor, models, calibrator), loading them on first use."""
+    global _RESOURCES
+    if _RESOURCES is None:
+        with _init_lock:
+            if _RESOURCES is None:
+                _RESOURCES = (load_preprocessor(), load_ensemble_models(), load_calibration())
+    return _RESOURCES
+
+
+def warmup():
+    """Load artifacts and run each model once on a dummy row so the first request is not slow."""
+    _, models, lr = load_resources()
+    for m in models:
+        try:
+            if isinstance(m, xgb.core.Booster):
+                m.predict(xgb.DMatrix(np.zeros((1, m.num_features()))))
+            elif hasattr(m, 'n_features_in_'):
+                m.predict(np.zeros((1, m.n_features_in_)))
+        except Exception:
+            pass
+    if lr is not None:
+        lr.predict(np.zeros((1, 1)))
+
+
+def apply_calibration(preds: np.ndarray) -> np.ndarray:
+    lr = load_resources()[2]
+    if lr is not None:
         # expect lr to be a scikit-learn regressor with predict
         return lr.predict(preds.reshape(-1, 1))
     return preds
 
 
-def score(input_csv: Path, output_csv: Path):
-    preproc = load_preprocessor()
-    models = load_ensemble_models()
+def score(input_csv: Path, output_csv: Path, output_dir: Path = ARTIFACTS):
+    """Score input_csv into output_csv; uncalibrated preds and metrics are written to output_dir."""
+    preproc, models, _ = load_resources()
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
 
     df = pd.read_csv(input_csv)
     # normalize minimal features (Rain tokens -> numeric etc.) as early as possible
@@ -296,7 +337,7 @@ def score(input_csv: Path, output_csv: Path):
     # Save uncalibrated predictions (keep original index so we can align with truth)
     uncal_out = pd.DataFrame({"prediction": avg}, index=idx)
     uncal_out.reset_index(inplace=True)
-    unc_path = ARTIFACTS / 'scored_preds_from_raw_uncalibrated.csv'
+    unc_path = output_dir / 'scored_preds_from_raw_uncalibrated.csv'
     uncal_out.to_csv(unc_path, index=False)
     print(f"Wrote uncalibrated predictions to {unc_path}")
 
@@ -354,9 +395,9 @@ def score(input_csv: Path, output_csv: Path):
                     'r2': float(r2_cal)
                 })
                 # write separate CSVs for calibrated and uncalibrated
-                pd.DataFrame([metrics[0]]).to_csv(ARTIFACTS / 'metrics_scored_from_raw_uncalibrated.csv', index=False)
-                pd.DataFrame([metrics[1]]).to_csv(ARTIFACTS / 'metrics_scored_from_raw_calibrated.csv', index=False)
-                print('Wrote metrics to artifacts/metrics_scored_from_raw_{uncalibrated,calibrated}.csv')
+                pd.DataFrame([metrics[0]]).to_csv(output_dir / 'metrics_scored_from_raw_uncalibrated.csv', index=False)
+                pd.DataFrame([metrics[1]]).to_csv(output_dir / 'metrics_scored_from_raw_calibrated.csv', index=False)
+                print(f'Wrote metrics to {output_dir}/metrics_scored_from_raw_{{uncalibrated,calibrated}}.csv')
         except Exception as e:
             import traceback
             print('Failed computing metrics:', e)
@@ -369,15 +410,18 @@ def score(input_csv: Path, output_csv: Path):
             placeholder_unc = {'type': 'uncalibrated', 'n': nrows, 'mse': None, 'rmse': None, 'mae': None, 'r2': None, 'error': str(e)}
             placeholder_cal = {'type': 'calibrated', 'n': nrows, 'mse': None, 'rmse': None, 'mae': None, 'r2': None, 'error': str(e)}
             try:
-                pd.DataFrame([placeholder_unc]).to_csv(ARTIFACTS / 'metrics_scored_from_raw_uncalibrated.csv', index=False)
-                pd.DataFrame([placeholder_cal]).to_csv(ARTIFACTS / 'metrics_scored_from_raw_calibrated.csv', index=False)
+                pd.DataFrame([placeholder_unc]).to_csv(output_dir / 'metrics_scored_from_raw_uncalibrated.csv', index=False)
+                pd.DataFrame([placeholder_cal]).to_csv(output_dir / 'metrics_scored_from_raw_calibrated.csv', index=False)
             except Exception:
                 pass
+    return out
 
 
 if __name__ == '__main__':
     ap = argparse.ArgumentParser()
     ap.add_argument('--input', required=True, help='CSV with raw input rows to score')
     ap.add_argument('--output', default=str(ARTIFACTS / 'scored_preds.csv'))
+    ap.add_argument('--output-dir', default=str(ARTIFACTS),
+                    help='directory for the uncalibrated predictions and metrics CSVs')
     args = ap.parse_args()
-    score(Path(args.input), Path(args.output))
+    score(Path(args.input), Path(args.output), Path(args.output_dir))
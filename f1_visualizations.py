@@ -1,49 +1,48 @@
 import pandas as pd
 import numpy as np
 
-def process_f1_results(file_path: str, sheet_name: str = "Sheet1"):
-    # Load
-df = pd.read_csv('~/Desktop/Desktop`/ALLMerged.csv', sheet_name=sheet_name)
+def reconstruct_finish_times(t, leader_time):
+    # If t is small (< leader_time/2), treat as gap to leader
+    finish = np.where(t < leader_time / 2, leader_time + t, t)
+    finish[0] = leader_time
+    return finish
+
 
-    # Parse the Time column into seconds
-    def parse_time_to_seconds(time_str):
-        try:
-            td = pd.to_timedelta(time_str)
-            return td.total_seconds()
-        except Exception:
-            return np.nan
+def process_f1_results(file_path: str, sheet_name: str = "Sheet1"):
+    # Load (sheet_name only applies to Excel workbooks)
+    if str(file_path).endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(file_path, sheet_name=sheet_name)
+    else:
+        df = pd.read_csv(file_path)
 
-    df['ParsedTime_s'] = df['Time'].apply(parse_time_to_seconds)
+    # Parse the Time column into seconds (unparseable values become NaN)
+    df['ParsedTime_s'] = pd.to_timedelta(df['Time'], errors='coerce').dt.total_seconds()
 
     # Work race by race (Season + Round)
     results = []
     for (season, rnd), group in df.groupby(['Season', 'Round']):
         group = group.sort_values(by="Position").copy()
 
+        t = group['ParsedTime_s'].to_numpy(dtype=float)
+
         # First car's ParsedTime_s is usually a full duration
-        leader_time = group.iloc[0]['ParsedTime_s']
+        leader_time = t[0]
 
         # If leader_time is valid, use it as reference
-        if pd.notnull(leader_time) and leader_time > 1000:  # sanity check (~>15 min)
-            total_times = [leader_time]
-            for i in range(1, len(group)):
-                t = group.iloc[i]['ParsedTime_s']
-                # If t is small (< leader_time/2), treat as gap to leader
-                if pd.notnull(t) and t < leader_time / 2:
-                    total_times.append(leader_time + t)
-                else:
-                    total_times.append(t)
-            group['FinishTime_s'] = total_times
+        if np.isfinite(leader_time) and leader_time > 1000:  # sanity check (~>15 min)
+            finish = reconstruct_finish_times(t, leader_time)
         else:
             # fallback: just use parsed time
-            group['FinishTime_s'] = group['ParsedTime_s']
+            finish = t
+        group['FinishTime_s'] = finish
 
         # Gap to car ahead
-        group['DeltaFromAhead_s'] = group['FinishTime_s'].diff().fillna(0)
+        delta = np.diff(finish, prepend=finish[0])
+        group['DeltaFromAhead_s'] = np.where(np.isnan(delta), 0.0, delta)
 
         # Deviation from race average
-        avg_time = group['FinishTime_s'].mean()
-        group['DeviationFromAvg_s'] = group['FinishTime_s'] - avg_time
+        avg_time = np.nanmean(finish) if np.isfinite(finish).any() else np.nan
+        group['DeviationFromAvg_s'] = finish - avg_time
 
         results.append(group)
 
@@ -1,5 +1,7 @@
 import pandas as pd
 
+from utils import read_table, write_csv
+
 # Input files
 RACE_FILE = "race_results_2023_2024_2025_with_pitstops.csv"
 QUALI_FILE = "QualiTimes.csv"
@@ -11,44 +13,35 @@ OUTPUT_FILE = "f1_merged_quali_race_weather_2023_2025.csv"
 
 def main():
     # Read inputs
-    race = pd.read_csv(RACE_FILE)
-    quali = pd.read_csv(QUALI_FILE)
-    weather = pd.read_csv(WEATHER_FILE)
+    race = read_table(RACE_FILE)
+    quali = read_table(QUALI_FILE)
+    weather = read_table(WEATHER_FILE)
 
     # Normalize key columns
     # Race: keys are Season (year), RoundNumber (round), Abbreviation (driver code)
-    race = race.copy()
-    race.rename(columns={"RoundNumber": "Round"}, inplace=True)
+    race = race.rename(columns={"RoundNumber": "Round"})
 
-    # Quali: keys are Season, Round, Driver (driver code)
-    quali = quali.copy()
+    # Quali: keys are Season, Round, Driver (driver code) -- used as-is
 
     # Weather: keys are Year, Round
-    weather = weather.copy()
-    weather.rename(columns={"Year": "Season"}, inplace=True)
-
-    # Merge quali times onto race results by Season+Round+Driver code
-    merged = race.merge(
-        quali[["Season", "Round", "Driver", "AvgQualiTime"]],
-        left_on=["Season", "Round", "Abbreviation"],
-        right_on=["Season", "Round", "Driver"],
-        how="left",
-    )
+    weather = weather.rename(columns={"Year": "Season"})
 
-    # Drop the helper column 'Driver' introduced from quali
-    if "Driver" in merged.columns:
-        merged.drop(columns=["Driver"], inplace=True)
+    # Merge quali times onto race results by Season+Round+Driver code.
+    # Joining race columns against an indexed lookup table avoids the generic
+    # multi-key merge and never introduces quali's 'Driver' helper column.
+    quali_times = quali.set_index(["Season", "Round", "Driver"])[["AvgQualiTime"]]
+    merged = race.join(quali_times, on=["Season", "Round", "Abbreviation"], how="left")
 
     # Merge weather by Season+Round (weather applies to all drivers in that event)
-    merged = merged.merge(
-        weather,
+    merged = merged.join(
+        weather.set_index(["Season", "Round"]),
         on=["Season", "Round"],
         how="left",
-        suffixes=("", "_weather"),
+        rsuffix="_weather",
     )
 
     # Write output
-    merged.to_csv(OUTPUT_FILE, index=False)
+    write_csv(merged, OUTPUT_FILE)
     print(f"Wrote merged file: {OUTPUT_FILE}")
     print(f"Rows: {len(merged):,}; Columns: {len(merged.columns)}")
 
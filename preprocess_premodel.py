@@ -2,34 +2,55 @@
 
 Outputs (in `artifacts/`):
 - preprocessing_pipeline.joblib
-- X_train.csv, X_val.csv, X_test.csv
+- X_train, X_val, X_test: CSR `.npz` when the transformed matrix is sparse, `.parquet` + `.csv` otherwise
+- feature_names.json
 - columns_used.json
 
 Assumptions:
 - Time-based split by `Season`: train=2023, val=2024, test=2025 if those seasons exist.
 - Drops identifier columns like `Unnamed: 0`, `FullName`, `HeadshotUrl`, `CountryCode`, `TeamColor`, `HeadshotUrl`.
 - Numeric columns imputed with median, scaled with StandardScaler.
-- Categorical columns imputed with constant 'missing' and OneHotEncoded (handle_unknown='ignore').
+- Driver/TeamName with more than MAX_OHE_CARDINALITY values are feature-hashed into HASH_FEATURES columns.
+- Categorical columns imputed with constant 'missing' and OneHotEncoded (handle_unknown='ignore', sparse output;
+  the ColumnTransformer only keeps it sparse when the overall density is below its sparse_threshold).
 - The target is not created here; script only prepares features.
+- Re-runs are skipped while `artifacts/.cache_key` matches the input CSV, this script, utils.py and
+  the installed pandas/scikit-learn versions, and every output above exists; pass `--force` to rebuild anyway.
 """
 
+import argparse
 import json
-import sys
 from pathlib import Path
 import pandas as pd
 import numpy as np
+from scipy import sparse
 
 # sklearn
+import sklearn
 from sklearn.compose import ColumnTransformer
+from sklearn.feature_extraction import FeatureHasher
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.pipeline import Pipeline
 import joblib
 
+from utils import write_csv
+
 BASE = Path(__file__).resolve().parent
 CSV = BASE / "premodeldatav1.csv"
 ARTIFACTS = BASE / "artifacts"
 ARTIFACTS.mkdir(exist_ok=True)
+CACHE_KEY = ARTIFACTS / '.cache_key'
+# files a cached run must still find before it is skipped
+OUTPUTS = ('preprocessing_pipeline.joblib', 'feature_names.json', 'columns_used.json',
+           'X_train.csv', 'X_val.csv', 'X_test.csv')
+
+# Driver/TeamName above this many distinct values are hashed rather than one-hot encoded
+MAX_OHE_CARDINALITY = 50
+HASH_FEATURES = 16
+
+# narrow dtypes for known small-integer columns of premodeldatav1.csv
+READ_DTYPES = {'Season': 'int16', 'Round': 'int8', 'DriverNumber': 'int8', 'Laps': 'int16'}
 
 def detect_splits(df):
     seasons = sorted(df['Season'].dropna().unique())
@@ -51,36 +72,90 @@ def choose_columns(df):
     # drop obvious identifiers and large text
     drop_candidates = ['Unnamed: 0','FullName','HeadshotUrl','CountryCode','TeamColor','HeadshotUrl','DriverId']
     drop_cols = [c for c in drop_candidates if c in df.columns]
-    # choose numeric and categorical
-    numeric = df.select_dtypes(include=[np.number]).columns.tolist()
+    # choose numeric and categorical from a single pass over the dtype map
+    # (bools are excluded, matching select_dtypes(include=np.number))
+    dtypes = df.dtypes
+    is_num = dtypes.map(lambda d: pd.api.types.is_numeric_dtype(d) and not pd.api.types.is_bool_dtype(d))
     # include ParsedTime_s, FinishTime_s etc
-    categorical = [c for c in df.columns if df[c].dtype == object and c not in drop_cols]
+    numeric = dtypes.index[is_num.to_numpy(dtype=bool)].tolist()
+    categorical = [c for c in dtypes.index[(dtypes == object).to_numpy()] if c not in drop_cols]
     # include Driver and TeamName as categorical features but guard cardinality
     for c in ['BroadcastName','Abbreviation','FirstName','LastName']:
         if c in categorical:
             categorical.remove(c)
-    # keep Driver and TeamName if cardinality reasonable; otherwise drop to avoid huge one-hot expansion
-    for col in ['Driver','TeamName']:
-        if col in df.columns:
-            nunique = df[col].nunique(dropna=True)
-            if nunique <= 50:
-                if col not in categorical:
-                    categorical.append(col)
-            else:
-                if col in categorical:
-                    categorical.remove(col)
+    # keep Driver and TeamName one-hot if cardinality reasonable; otherwise feature-hash them
+    # into HASH_FEATURES columns instead of a huge one-hot expansion
+    hashed = []
+    guarded = [c for c in ['Driver','TeamName'] if c in df.columns]
+    nuniques = df[guarded].nunique(dropna=True)
+    for col in guarded:
+        if nuniques[col] <= MAX_OHE_CARDINALITY:
+            if col not in categorical:
+                categorical.append(col)
+        else:
+            if col in categorical:
+                categorical.remove(col)
+            hashed.append(col)
     # Note: do not force 'Rain' into categorical here. The main() function
     # will coerce/encode the Rain column to a binary 0/1 integer before
     # column selection so it will appear in numeric if present.
     # remove AvgPitStopTime from features (it may be present)
     if 'AvgPitStopTime' in numeric:
         numeric.remove('AvgPitStopTime')
-    return numeric, categorical, drop_cols
+    return numeric, categorical, hashed, drop_cols
+
+
+def save_matrix(X, name, feature_names):
+    """Persist one transformed split: CSR `.npz` when sparse, Parquet otherwise, plus a CSV either way.
+
+    The zstd Parquet/npz copy is the fast binary format; the CSV is always
+    written because artifacts/score_model.py and the SHAP scripts read
+    `X_*.csv` (a sparse split is densified for it). The copy in the other
+    binary format is removed so a stale `.npz`/`.parquet` from an earlier run
+    is never picked up next to the fresh one.
+    """
+    if sparse.issparse(X):
+        X = sparse.csr_matrix(X)
+        (ARTIFACTS / f'{name}.parquet').unlink(missing_ok=True)
+        sparse.save_npz(ARTIFACTS / f'{name}.npz', X)
+        write_csv(pd.DataFrame(X.toarray(), columns=feature_names), ARTIFACTS / f'{name}.csv')
+    else:
+        frame = pd.DataFrame(X, columns=feature_names)
+        (ARTIFACTS / f'{name}.npz').unlink(missing_ok=True)
+        frame.to_parquet(ARTIFACTS / f'{name}.parquet', compression='zstd', engine='pyarrow', index=False)
+        write_csv(frame, ARTIFACTS / f'{name}.csv')
+
+
+def cache_key():
+    """Size/mtime fingerprint of the input CSV, this script and utils.py, plus the pandas/sklearn versions."""
+    parts = []
+    for p in (CSV, Path(__file__).resolve(), BASE / 'utils.py'):
+        st = p.stat()
+        parts.append(f"{st.st_size}-{st.st_mtime_ns}")
+    parts += [f"pandas-{pd.__version__}", f"sklearn-{sklearn.__version__}"]
+    return ':'.join(parts)
 
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--force', action='store_true', help='rebuild even if the cache key matches')
+    args = parser.parse_args()
+
+    key = cache_key()
+    if (not args.force and CACHE_KEY.exists() and CACHE_KEY.read_text() == key
+            and all((ARTIFACTS / name).exists() for name in OUTPUTS)):
+        print(f"{CSV.name} unchanged since last run; reusing artifacts/ (pass --force to rebuild)")
+        return
     print(f"Loading {CSV}")
-    df = pd.read_csv(CSV)
+    # probe the header so dtypes are only declared for columns that exist,
+    # then parse with the multi-threaded pyarrow reader
+    header = pd.read_csv(CSV, nrows=0).columns
+    dtypes = {c: t for c, t in READ_DTYPES.items() if c in header}
+    df = pd.read_csv(CSV, engine='pyarrow', dtype=dtypes)
+    # the pyarrow engine yields None for empty strings; use NaN like the C
+    # parser so SimpleImputer (missing_values=np.nan) sees them as missing
+    obj_cols = df.columns[(df.dtypes == object).to_numpy()]
+    df[obj_cols] = df[obj_cols].where(df[obj_cols].notna(), np.nan)
     print("Shape:", df.shape)
     print("Columns:", df.columns.tolist())
 
@@ -88,40 +163,33 @@ def main():
     # Common values observed in the dataset: 'Rain' and 'NoRain'.
     # We'll handle a few textual variants conservatively.
     if 'Rain' in df.columns:
-        def _map_rain(v):
-            try:
-                s = str(v).strip().lower()
-            except Exception:
-                return 0
-            if s == '' or s in ('nan', 'none'):
-                return 0
-            # explicit negative forms -> 0
-            if s.startswith('no') or s.startswith('n') and 'rain' not in s:
-                return 0
-            # if the token equals 'rain' or contains 'rain' (but not 'norain')
-            if 'rain' in s and not s.startswith('no'):
-                return 1
-            return 0
-
-        df['Rain'] = df['Rain'].apply(_map_rain).astype(int)
+        # vectorized: any token containing 'rain' counts as rain unless it is
+        # an explicit negative ('norain', 'no rain', ...); NaN/empty -> 0
+        rain = df['Rain'].astype('string').str.strip().str.lower()
+        df['Rain'] = (rain.str.contains('rain', regex=False, na=False)
+                      & ~rain.str.startswith('no', na=False)).astype('int8')
 
     # quick diagnostics
     print('\nDtypes:')
     print(df.dtypes.value_counts())
     print('\nMissing counts (top 20):')
-    print(df.isna().sum().sort_values(ascending=False).head(20))
+    # count column-at-a-time so no full boolean copy of df is materialized
+    missing = pd.Series({c: df[c].isna().sum() for c in df.columns}, dtype='int64')
+    print(missing.sort_values(ascending=False).head(20))
 
     # choose columns
-    numeric, categorical, drop_cols = choose_columns(df)
-    print(f"\nSelected {len(numeric)} numeric and {len(categorical)} categorical features. Dropping: {drop_cols}")
+    numeric, categorical, hashed, drop_cols = choose_columns(df)
+    print(f"\nSelected {len(numeric)} numeric, {len(categorical)} categorical and {len(hashed)} hashed features. Dropping: {drop_cols}")
 
     # detect splits
     s_train, s_val, s_test = detect_splits(df)
     print(f"Using seasons splits: train={s_train}, val={s_val}, test={s_test}")
 
-    train = df[df['Season'] == s_train].copy()
-    val = df[df['Season'] == s_val].copy()
-    test = df[df['Season'] == s_test].copy()
+    # boolean-mask slicing already allocates new frames, so skip the extra
+    # .copy(); take() returns them without the SettingWithCopy flag, which
+    # keeps the in-place rare-category assignments below warning-free
+    season = df['Season'].to_numpy()
+    train, val, test = (df.take(np.flatnonzero(season == s)) for s in (s_train, s_val, s_test))
 
     # map very rare categorical values to 'OTHER' to avoid exploding one-hot columns
     category_mappings = {}
@@ -133,9 +201,10 @@ def main():
             rare = counts[counts <= thresh].index.tolist()
             if rare:
                 category_mappings[col] = rare
-                train[col] = train[col].fillna('missing').apply(lambda x: x if x not in rare else 'OTHER')
-                val[col] = val[col].fillna('missing').apply(lambda x: x if x not in rare else 'OTHER')
-                test[col] = test[col].fillna('missing').apply(lambda x: x if x not in rare else 'OTHER')
+                rare_set = set(rare)
+                for sub in (train, val, test):
+                    values = sub[col].fillna('missing')
+                    sub[col] = values.where(~values.isin(rare_set), 'OTHER')
 
     # persist mappings for future transform time
     if category_mappings:
@@ -149,15 +218,23 @@ def main():
     ])
     categorical_transformer = Pipeline([
         ('imputer', SimpleImputer(strategy='constant', fill_value='missing')),
-        # use sparse_output for newer sklearn; fall back handled by environment
+        # sparse output avoids densifying wide one-hot blocks; the ColumnTransformer
+        # decides whether the stacked result stays sparse (sparse_threshold)
         # handle_unknown='ignore' ensures new teams/drivers at transform time won't break the pipeline
-        ('ohe', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
+        ('ohe', OneHotEncoder(handle_unknown='ignore', sparse_output=True))
     ])
 
-    preprocessor = ColumnTransformer([
+    transformers = [
         ('num', numeric_transformer, numeric),
         ('cat', categorical_transformer, categorical)
-    ], remainder='drop')
+    ]
+    if hashed:
+        # each row's Driver/TeamName strings are hashed into a fixed-width sparse block
+        transformers.append(('hash', Pipeline([
+            ('imputer', SimpleImputer(strategy='constant', fill_value='missing')),
+            ('hasher', FeatureHasher(n_features=HASH_FEATURES, input_type='string'))
+        ]), hashed))
+    preprocessor = ColumnTransformer(transformers, remainder='drop')
 
     pipeline = Pipeline([
         ('preprocessor', preprocessor)
@@ -166,10 +243,12 @@ def main():
     print('Fitting pipeline on training data...')
     pipeline.fit(train)
 
-    # transform and save
-    X_train = pipeline.transform(train)
-    X_val = pipeline.transform(val)
-    X_test = pipeline.transform(test)
+    # transform all splits in one call, then slice the rows back apart
+    n_tr, n_va = len(train), len(val)
+    X_all = pipeline.transform(pd.concat([train, val, test]))
+    if sparse.issparse(X_all):
+        X_all = sparse.csr_matrix(X_all)
+    X_train, X_val, X_test = X_all[:n_tr], X_all[n_tr:n_tr + n_va], X_all[n_tr + n_va:]
 
     # save feature names robustly
     # drop numeric columns that had no observed values in train (imputer would skip them)
@@ -181,7 +260,8 @@ def main():
         for col, cats_vals in zip(categorical, cats):
             for v in cats_vals:
                 ohe_names.append(f"{col}__{v}")
-    feature_names = num_names + ohe_names
+    hash_names = [f"hash__{i}" for i in range(HASH_FEATURES)] if hashed else []
+    feature_names = num_names + ohe_names + hash_names
     # if shapes still mismatch, try to retrieve names from the transformer (sklearn >=1.0)
     if X_train.shape[1] != len(feature_names):
         try:
@@ -191,16 +271,20 @@ def main():
             # final fallback: generic feature names matching produced shape
             feature_names = [f"f_{i}" for i in range(X_train.shape[1])]
 
-    # save as CSVs
-    pd.DataFrame(X_train, columns=feature_names).to_csv(ARTIFACTS / 'X_train.csv', index=False)
-    pd.DataFrame(X_val, columns=feature_names).to_csv(ARTIFACTS / 'X_val.csv', index=False)
-    pd.DataFrame(X_test, columns=feature_names).to_csv(ARTIFACTS / 'X_test.csv', index=False)
+    # save transformed splits (feature names stored separately so sparse splits keep them)
+    for name, X in (('X_train', X_train), ('X_val', X_val), ('X_test', X_test)):
+        save_matrix(X, name, feature_names)
+    with open(ARTIFACTS / 'feature_names.json', 'w') as f:
+        json.dump(feature_names, f, indent=2)
 
     # save any cardinality decisions for reference
     with open(ARTIFACTS / 'columns_used.json', 'w') as f:
-        json.dump({'numeric': numeric, 'categorical': categorical, 'drop': drop_cols}, f, indent=2)
+        json.dump({'numeric': numeric, 'categorical': categorical, 'hashed': hashed,
+                   'categorical_encoding': {**{c: 'onehot' for c in categorical}, **{c: 'hash' for c in hashed}},
+                   'drop': drop_cols}, f, indent=2)
 
     joblib.dump(pipeline, ARTIFACTS / 'preprocessing_pipeline.joblib')
+    CACHE_KEY.write_text(key)
 
     print('Saved pipeline and transformed datasets to artifacts/')
 
@@ -18,6 +18,9 @@ import argparse
 import requests
 import time
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 
 ROOT = Path(__file__).resolve().parents[1]
 logo_dir = ROOT / 'assets' / 'logos'
@@ -26,13 +29,23 @@ logo_dir.mkdir(parents=True, exist_ok=True)
 def sanitize(name: str) -> str:
     return ''.join([ch for ch in str(name) if ch.isalnum() or ch in (' ','-')]).replace(' ','_')
 
-def download(url: str, dest: Path, timeout=20):
-    # use common browser user-agent and referer to avoid simple 403 blocks
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.6 Safari/605.1.15',
-        'Referer': 'https://www.google.com/'
-    }
-    with requests.get(url, timeout=timeout, headers=headers, stream=True) as resp:
+# use common browser user-agent and referer to avoid simple 403 blocks
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.6 Safari/605.1.15',
+    'Referer': 'https://www.google.com/'
+}
+
+def make_session(pool_size=8) -> requests.Session:
+    # one pooled keep-alive session shared by all workers
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def download(session: requests.Session, url: str, dest: Path, timeout=20):
+    with session.get(url, timeout=timeout, stream=True) as resp:
         resp.raise_for_status()
         # write in chunks
         with dest.open('wb') as fh:
@@ -44,7 +57,8 @@ def main():
     p = argparse.ArgumentParser()
     p.add_argument('--input', '-i', required=True, help='CSV file with TeamName,URL')
     p.add_argument('--dry-run', action='store_true', help='Do not download; just show mapping')
-    p.add_argument('--wait', type=float, default=0.5, help='Seconds to wait between downloads')
+    p.add_argument('--wait', type=float, default=0.5, help='Seconds to wait between downloads from the same host')
+    p.add_argument('--workers', type=int, default=8, help='Number of parallel downloads')
     args = p.parse_args()
 
     csvp = Path(args.input)
@@ -63,19 +77,40 @@ def main():
                 sys.exit(1)
 
     print('Found', len(rows), 'rows to process')
+    jobs = []
     for team, url in rows:
         safe = sanitize(team)
         dest = logo_dir / (safe + '.png')
         print(team, '->', dest.name)
-        if args.dry_run:
-            continue
+        jobs.append((url, dest))
+    if args.dry_run:
+        print('Done. Logos saved to', logo_dir)
+        return
+
+    session = make_session(args.workers)
+    # downloads overlap; --wait only spaces out the *start* of requests to the
+    # same host. The lock is held just long enough to reserve a start slot.
+    slot_lock = threading.Lock()
+    next_allowed = {}
+
+    def fetch(job):
+        url, dest = job
+        host = urlparse(url).netloc
+        with slot_lock:
+            start = max(time.monotonic(), next_allowed.get(host, 0.0))
+            next_allowed[host] = start + args.wait
+        delay = start - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
         try:
             print('Downloading', url)
-            download(url, dest)
-            time.sleep(args.wait)
+            download(session, url, dest)
         except Exception as e:
             print('Failed to download', url, 'error:', e)
 
+    with ThreadPoolExecutor(max_workers=args.workers) as ex:
+        list(ex.map(fetch, jobs))
+
     print('Done. Logos saved to', logo_dir)
 
 if __name__ == '__main__':
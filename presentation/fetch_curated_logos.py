@@ -3,22 +3,19 @@
 This is a one-off helper that uses safe headers and writes to assets/logos/.
 """
 from pathlib import Path
+import asyncio
 import pandas as pd
-import requests
+
+try:
+    import cairosvg
+except Exception:
+    cairosvg = None
 
 ROOT = Path(__file__).resolve().parents[1]
 ART = ROOT / 'artifacts'
 logo_dir = ROOT / 'assets' / 'logos'
 logo_dir.mkdir(parents=True, exist_ok=True)
 
-csvp = ART / 'prediction_singapore_full.csv'
-if not csvp.exists():
-    raise SystemExit('prediction_singapore_full.csv not found in artifacts/')
-
-df = pd.read_csv(csvp)
-teams = sorted(df['TeamName'].dropna().unique().tolist())
-print('Teams in predictions:', teams)
-
 # curated mapping (team string -> PNG URL)
 mapping = {
     'Red Bull Racing': 'https://upload.wikimedia.org/wikipedia/en/5/51/Red_Bull_Racing_Logo.svg',
@@ -40,21 +37,53 @@ headers = {'User-Agent': 'Mozilla/5.0', 'Referer': 'https://www.google.com/'}
 def sanitize(name: str) -> str:
     return ''.join([ch for ch in str(name) if ch.isalnum() or ch in (' ','-')]).replace(' ','_')
 
-for t in teams:
-    url = mapping.get(t)
-    if not url:
-        print('No mapping for', t)
-        continue
+def to_png(content: bytes, url: str = '') -> bytes:
+    # rasterize SVG payloads once here so plt.imread gets a real PNG later
+    if content.lstrip().startswith(b'<'):
+        if cairosvg is not None:
+            return cairosvg.svg2png(bytestring=content, output_width=256)
+        print('Warning: cairosvg not installed; saving SVG markup under a .png name for', url,
+              '(pip install cairosvg to rasterize)')
+    return content
+
+def _get_blocking(url):
+    import requests
+    r = requests.get(url, headers=headers, timeout=20)
+    r.raise_for_status()
+    return r.content
+
+async def fetch(team, url):
     # try to fetch the SVG or PNG and save as PNG when possible
-    dest = logo_dir / (sanitize(t) + '.png')
+    dest = logo_dir / (sanitize(team) + '.png')
     try:
-        r = requests.get(url, headers=headers, timeout=20)
-        r.raise_for_status()
-        content = r.content
-        # if SVG, try to save raw svg as png extension (browsers will still render if inlined as SVG data-url)
-        dest.write_bytes(content)
+        # requests is blocking, so each download runs in a worker thread
+        content = await asyncio.to_thread(_get_blocking, url)
+        # without cairosvg, raw svg is saved under the png extension (browsers will still render if inlined as SVG data-url)
+        dest.write_bytes(to_png(content, url))
         print('Wrote', dest)
     except Exception as e:
-        print('Failed to download', t, url, 'err:', e)
+        print('Failed to download', team, url, 'err:', e)
+
+async def main_async(teams):
+    jobs = []
+    for t in teams:
+        url = mapping.get(t)
+        if not url:
+            print('No mapping for', t)
+            continue
+        jobs.append((t, url))
+    await asyncio.gather(*[fetch(t, u) for t, u in jobs])
+
+def main():
+    csvp = ART / 'prediction_singapore_full.csv'
+    if not csvp.exists():
+        raise SystemExit('prediction_singapore_full.csv not found in artifacts/')
+
+    df = pd.read_csv(csvp)
+    teams = sorted(df['TeamName'].dropna().unique().tolist())
+    print('Teams in predictions:', teams)
+    asyncio.run(main_async(teams))
+    print('Done')
 
-print('Done')
+if __name__ == '__main__':
+    main()
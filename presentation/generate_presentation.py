@@ -3,10 +3,19 @@
 Generate simple presentation assets: preds vs truth, residuals, and feature importance (if available)
 """
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 from pathlib import Path
 import numpy as np
 
+
+def first_hot_index(onehot):
+    # index of the first column equal to 1 in each row, -1 when there is none
+    hot = onehot == 1
+    return np.where(hot.any(axis=1), hot.argmax(axis=1), -1)
+
+
 ROOT = Path(__file__).resolve().parents[1]
 ART = ROOT / 'artifacts'
 OUT = ROOT / 'presentation'
@@ -28,7 +37,7 @@ if 'DeviationFromAvg_s' in merged.columns:
     mask = ~y.isna()
     # preds vs truth
     plt.figure(figsize=(6,6))
-    plt.scatter(y[mask], yhat[mask], alpha=0.6)
+    plt.scatter(y[mask], yhat[mask], alpha=0.6, rasterized=True)
     plt.plot([y.min(), y.max()], [y.min(), y.max()], 'r--')
     plt.xlabel('True DeviationFromAvg_s')
     plt.ylabel('Predicted')
@@ -56,7 +65,7 @@ if 'DeviationFromAvg_s' in merged.columns:
     # residual vs GridPosition scatter (if present)
     if 'GridPosition' in merged.columns:
         plt.figure(figsize=(8,4))
-        plt.scatter(merged.loc[mask, 'GridPosition'], res, alpha=0.6)
+        plt.scatter(merged.loc[mask, 'GridPosition'], res, alpha=0.6, rasterized=True)
         plt.xlabel('GridPosition')
         plt.ylabel('Residual (pred - true)')
         plt.title('Residual vs GridPosition')
@@ -68,16 +77,10 @@ if 'DeviationFromAvg_s' in merged.columns:
     present_tyres = [c for c in tyre_cols if c in merged.columns]
     if present_tyres:
         # create a compound label column by picking the first tyre with value==1 else 'UNKNOWN'
-        def pick_compound(row):
-            for c in present_tyres:
-                try:
-                    if int(row[c]) == 1:
-                        return c
-                except Exception:
-                    continue
-            return 'UNKNOWN'
         df_tyres = merged.loc[mask, present_tyres + ['prediction', 'DeviationFromAvg_s']].copy()
-        df_tyres['compound'] = df_tyres.apply(pick_compound, axis=1)
+        onehot = df_tyres[present_tyres].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        idx = first_hot_index(onehot)
+        df_tyres['compound'] = np.where(idx >= 0, np.array(present_tyres)[np.maximum(idx, 0)], 'UNKNOWN')
         df_tyres['residual'] = df_tyres['prediction'] - df_tyres['DeviationFromAvg_s']
         try:
             import seaborn as sns
@@ -177,7 +180,7 @@ try:
         df_w = df_w.sort_values('GridPosition').reset_index(drop=True)
         # use prediction as predicted DeviationFromAvg_s
         values = df_w['prediction'].astype(float).fillna(0.0)
-        colors = ['red' if v>0 else 'green' for v in values]
+        colors = np.where(values.to_numpy() > 0, 'red', 'green').tolist()
         plt.figure(figsize=(12,4))
         plt.bar(df_w['GridPosition'].astype(int).astype(str), values, color=colors)
         plt.axhline(0, color='k', linewidth=0.6)
@@ -209,7 +212,27 @@ try:
         df_team = merged.loc[mask, ['TeamName', weather_col, 'prediction']].copy()
         df_team[weather_col] = df_team[weather_col].fillna('Unknown').astype(str)
         # aggregate
-        agg = df_team.groupby(['TeamName', weather_col]).agg(mean_pred=('prediction','mean'), n=('prediction','count')).reset_index()
+        # aggregate with one bincount pass over combined (team, weather) codes;
+        # sorted factorize keeps the same group order as groupby
+        codes_t, team_keys = pd.factorize(df_team['TeamName'], sort=True)
+        codes_w, weather_keys = pd.factorize(df_team[weather_col], sort=True)
+        keep = codes_t >= 0
+        n_w = len(weather_keys)
+        key = codes_t[keep] * n_w + codes_w[keep]
+        preds = df_team['prediction'].to_numpy(dtype=float)[keep]
+        valid = ~np.isnan(preds)
+        size = np.bincount(key, minlength=len(team_keys) * n_w)
+        counts = np.bincount(key, weights=valid, minlength=size.size)
+        sums = np.bincount(key, weights=np.where(valid, preds, 0.0), minlength=size.size)
+        nz = np.flatnonzero(size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_pred = sums[nz] / counts[nz]
+        agg = pd.DataFrame({
+            'TeamName': np.asarray(team_keys)[nz // n_w],
+            weather_col: np.asarray(weather_keys)[nz % n_w],
+            'mean_pred': mean_pred,
+            'n': counts[nz].astype(int),
+        })
 
         # prepare x positions for weather categories
         weathers = sorted(agg[weather_col].unique())
@@ -219,6 +242,10 @@ try:
         teams = sorted(agg['TeamName'].unique())
         cmap = plt.get_cmap('tab20')
         team_color = {t: cmap(i % 20) for i,t in enumerate(teams)}
+        # per-team values computed once rather than per (team, weather) point:
+        # sanitized logo name and a deterministic jitter (stable across runs)
+        safe_by_team = {t: ''.join([ch for ch in t if ch.isalnum() or ch in (' ','-')]).replace(' ','_') for t in teams}
+        jitter_by_team = {t: ((sum([ord(c) for c in str(t)]) % 100) / 500.0) - 0.1 for t in teams}
 
         plt.figure(figsize=(10,6))
         ax = plt.gca()
@@ -228,35 +255,39 @@ try:
         import os
 
         logo_base = ROOT / 'assets' / 'logos'
+        fname_by_team = {t: logo_base / (safe + '.png') for t, safe in safe_by_team.items()}
 
-        for _, row in agg.iterrows():
-            t = row['TeamName']
-            w = row[weather_col]
-            # deterministic jitter based on team name (stable across runs)
-            sum_ord = sum([ord(c) for c in str(t)])
-            jitter = ((sum_ord % 100) / 500.0) - 0.1
-            x = wx[w] + jitter
-            y = float(row['mean_pred'])
-            size = max(40, min(300, int(row['n']) * 20))
-
-            # try to load a logo image for the team (sanitized name)
-            safe = ''.join([ch for ch in t if ch.isalnum() or ch in (' ','-')]).replace(' ','_')
-            fname = logo_base / (safe + '.png')
+        # decode each team logo once instead of once per (team, weather) point;
+        # None marks a logo that exists but failed to load
+        team_img_cache = {}
+        for t, fname in fname_by_team.items():
             if fname.exists():
+                try:
+                    team_img_cache[t] = plt.imread(str(fname))
+                except Exception:
+                    team_img_cache[t] = None
+
+        for t, w, mean_pred, n in agg[['TeamName', weather_col, 'mean_pred', 'n']].itertuples(index=False, name=None):
+            x = wx[w] + jitter_by_team[t]
+            y = float(mean_pred)
+            size = max(40, min(300, int(n) * 20))
+
+            # use the team logo if one was loaded
+            if team_img_cache.get(t) is not None:
                 try:
                     # scale zoom by sample count so larger samples show larger logos
-                    zoom = 0.12 + min(0.8, float(row['n']) / 50.0)
-                    img = OffsetImage(plt.imread(str(fname)), zoom=zoom)
+                    zoom = 0.12 + min(0.8, float(n) / 50.0)
+                    img = OffsetImage(team_img_cache[t], zoom=zoom)
                     ab = AnnotationBbox(img, (x,y), frameon=False)
                     ax.add_artist(ab)
                 except Exception:
-                    ax.scatter(x, y, s=size, color=team_color.get(t,'gray'), alpha=0.9, edgecolor='k')
+                    ax.scatter(x, y, s=size, color=team_color.get(t,'gray'), alpha=0.9, edgecolor='k', rasterized=True)
             else:
-                ax.scatter(x, y, s=size, color=team_color.get(t,'gray'), alpha=0.9, edgecolor='k')
+                ax.scatter(x, y, s=size, color=team_color.get(t,'gray'), alpha=0.9, edgecolor='k', rasterized=True)
 
             # annotate sample count next to each point
             try:
-                ax.text(x + 0.03, y, f"n={int(row['n'])}", fontsize=8, alpha=0.8)
+                ax.text(x + 0.03, y, f"n={int(n)}", fontsize=8, alpha=0.8)
             except Exception:
                 pass
 
@@ -6,6 +6,7 @@ and writes presentation/prediction_singapore_report.html embedding images and a
 """
 from pathlib import Path
 import pandas as pd
+import numpy as np
 import html
 import base64
 
@@ -29,18 +30,22 @@ df = pd.read_csv(pred_full)
 rr_file = ROOT / 'race_results_2023_2024_2025.csv'
 if rr_file.exists():
     try:
-        rr = pd.read_csv(rr_file, dtype=str)
+        # only the three filter columns are needed from this wide file
+        wanted = [c for c in ('Season', 'DriverId', 'FullName') if c in pd.read_csv(rr_file, nrows=0).columns]
+        try:
+            rr = pd.read_csv(rr_file, usecols=wanted, dtype=str, engine='pyarrow')
+        except ImportError:
+            rr = pd.read_csv(rr_file, usecols=wanted, dtype=str, low_memory=False)
         if 'Season' in rr.columns:
             mask2025 = rr['Season'].astype(str) == '2025'
             drivers2025_id = set(rr.loc[mask2025, 'DriverId'].dropna().astype(str).str.strip())
             drivers2025_name = set(rr.loc[mask2025, 'FullName'].dropna().astype(str).str.strip())
             if drivers2025_id or drivers2025_name:
-                def _is_active(row):
-                    did = str(row.get('DriverId', '')).strip()
-                    name = str(row.get('FullName', '')).strip()
-                    return (did in drivers2025_id) or (name in drivers2025_name)
+                # vectorized membership test on DriverId / FullName
+                did = df['DriverId'].astype(str).str.strip() if 'DriverId' in df.columns else pd.Series('', index=df.index)
+                name = df['FullName'].astype(str).str.strip() if 'FullName' in df.columns else pd.Series('', index=df.index)
                 before = len(df)
-                df = df[df.apply(_is_active, axis=1)].reset_index(drop=True)
+                df = df.loc[did.isin(drivers2025_id) | name.isin(drivers2025_name)].reset_index(drop=True)
                 after = len(df)
                 print(f'Filtered predictions to 2025 drivers: {before} -> {after} rows')
             else:
@@ -56,6 +61,7 @@ if 'prediction' not in df.columns:
 
 # compute gap-from-winner (seconds behind predicted winner)
 df = df.copy()
+# kept as float64 so the displayed predictions and gaps are not rounded through float32
 df['prediction'] = pd.to_numeric(df['prediction'], errors='coerce')
 pred_min = df['prediction'].min()
 df['SecondsBehindPredWinner_s'] = df['prediction'] - pred_min
@@ -75,25 +81,28 @@ if tyre_counts.exists():
 
 # detect per-driver compound if encoded in one-hot cols or explicit column
 tyre_cols = ['SOFT', 'MEDIUM', 'HARD', 'INTERMEDIATE', 'WET']
-def detect_compound(row):
-    # prefer an explicit Compound-like column
-    for cand in ['Compound', 'PredictedCompound', 'StartCompound']:
-        if cand in row.index and pd.notna(row[cand]):
-            return str(row[cand])
-    # otherwise check binary columns
-    for c in tyre_cols:
-        if c in row.index:
-            try:
-                v = row[c]
-                if (pd.notna(v) and int(float(v)) == 1):
-                    return c
-            except Exception:
-                # non-numeric (e.g., True/False)
-                if str(v).lower() in ('true','1','yes'):
-                    return c
-    return ''
+def detect_compound(frame):
+    # binary columns: the first tyre column whose value truncates to 1,
+    # or non-numeric text like True/yes
+    present = [c for c in tyre_cols if c in frame.columns]
+    onehot_name = pd.Series('', index=frame.index, dtype=object)
+    if present:
+        raw = frame[present]
+        num = raw.apply(pd.to_numeric, errors='coerce')
+        texty = raw.notna() & num.isna()
+        truthy = raw.astype(str).apply(lambda s: s.str.lower().isin(('true', '1', 'yes')))
+        hot = ((np.trunc(num) == 1) | (texty & truthy)).to_numpy()
+        onehot_name[:] = np.where(hot.any(axis=1), np.array(present)[hot.argmax(axis=1)], '')
+    # an explicit Compound-like column takes precedence
+    explicit_cols = [c for c in ['Compound', 'PredictedCompound', 'StartCompound'] if c in frame.columns]
+    if not explicit_cols:
+        return onehot_name
+    explicit = frame[explicit_cols[0]]
+    for c in explicit_cols[1:]:
+        explicit = explicit.where(explicit.notna(), frame[c])
+    return explicit.astype(str).where(explicit.notna(), onehot_name)
 
-df_sorted['PredictedCompound'] = df_sorted.apply(detect_compound, axis=1)
+df_sorted['PredictedCompound'] = detect_compound(df_sorted)
 
 # ensure there's a driver display column
 if 'Driver' not in df_sorted.columns:
@@ -107,36 +116,51 @@ if 'Driver' not in df_sorted.columns:
         # fallback to DriverId or empty
         df_sorted['Driver'] = df_sorted.get('DriverId', '')
 
-# inline logo helper (used in the table per-row)
+# inline logo helper (used in the table per-row and for the winner heading):
+# every logo is read and base64-encoded once, keyed by lower-cased file stem
 logo_base = ROOT / 'assets' / 'logos'
+def sanitize(name):
+    return ''.join([ch for ch in str(name) if ch.isalnum() or ch in (' ','-')]).replace(' ','_')
+
+LOGO_MIME = {'.png': 'image/png', '.svg': 'image/svg+xml'}
+LOGO_CACHE = {}
+# svgs are visited first so a png with the same stem takes precedence
+for fname in sorted(logo_base.glob('*'), key=lambda p: p.suffix.lower() == '.png'):
+    mime = LOGO_MIME.get(fname.suffix.lower())
+    if mime is None:
+        continue
+    try:
+        b64 = base64.b64encode(fname.read_bytes()).decode('ascii')
+    except Exception:
+        continue
+    LOGO_CACHE[fname.stem.lower()] = f'data:{mime};base64,{b64}'
+
 def inline_logo_for_team(team_name, height=22):
     if not team_name or pd.isna(team_name):
         return ''
-    # find a matching logo file (prefer .png, fall back to .svg)
-    safe = ''.join([ch for ch in str(team_name) if ch.isalnum() or ch in (' ','-')]).replace(' ','_')
-    candidates = [logo_base / (safe + ext) for ext in ('.png', '.PNG', '.svg', '.SVG')]
-    fname = None
-    for p in candidates:
-        if p.exists():
-            fname = p
-            break
-    if fname is None:
-        return ''
-    try:
-        data = fname.read_bytes()
-        b64 = base64.b64encode(data).decode('ascii')
-        if fname.suffix.lower() == '.svg':
-            mime = 'image/svg+xml'
-        else:
-            mime = 'image/png'
-        return f'<img src="data:{mime};base64,{b64}" style="height:{height}px;vertical-align:middle;margin-right:6px">'
-    except Exception:
+    uri = LOGO_CACHE.get(sanitize(team_name).lower())
+    if uri is None:
         return ''
+    return f'<img src="{uri}" style="height:{height}px;vertical-align:middle;margin-right:6px">'
 
 # weather summary: look for columns in df like AirTemp_C, TrackTemp_C, Humidity_%
 weather_keys = ['AirTemp_C', 'TrackTemp_C', 'Humidity_%', 'Pressure_hPa', 'WindSpeed_mps', 'WindDirection_deg']
 weather = {k: (df_sorted[k].iloc[0] if k in df_sorted.columns else None) for k in weather_keys}
 
+# repeated driver/team/compound values are escaped once per distinct value;
+# the key includes the type so 20 and 20.0 keep their own text
+escape_cache = {}
+def esc(v):
+    key = (type(v), v)
+    try:
+        return escape_cache[key]
+    except KeyError:
+        out = escape_cache[key] = html.escape(str(v))
+        return out
+    except TypeError:
+        # unhashable cell value
+        return html.escape(str(v))
+
 def make_table_html(df_in, nrows=999):
     # keep a concise set of columns if available
     cols = [c for c in ['GridPosition','Driver','DriverNumber','TeamName','prediction','PredictedCompound','SecondsBehindPredWinner_s'] if c in df_in.columns]
@@ -146,28 +170,30 @@ def make_table_html(df_in, nrows=999):
         out.append(f'<th>{html.escape(c)}</th>')
     out.append('</tr></thead>')
     out.append('<tbody>')
+    # render every cell of a column up front (vectorized 3-decimal formatting for
+    # the float prediction/gap columns, logo + name for TeamName), so the row
+    # loop below is a plain lookup with no per-cell branching
+    head = df_in.head(nrows)
+    cells = {}
+    for c in cols:
+        col = head[c]
+        if c in ('prediction', 'SecondsBehindPredWinner_s') and pd.api.types.is_float_dtype(col):
+            text = col.map(lambda v: '' if pd.isna(v) else f'{v:.3f}').tolist()
+        else:
+            text = ['' if pd.isna(v) else v for v in col.tolist()]
+        if c == 'TeamName':
+            # inline logo + team name
+            cells[c] = [f"<td>{inline_logo_for_team(v, height=20)}{esc(v)}</td>" for v in text]
+        else:
+            cells[c] = [f'<td>{esc(v)}</td>' for v in text]
     # first row is predicted winner (sorted ascending)
-    for idx, r in df_in.head(nrows).iterrows():
+    for i in range(len(head)):
         # highlight winner row
         tr_style = ''
-        if idx == 0:
+        if head.index[i] == 0:
             tr_style = ' style="background:#e6ffe6;font-weight:700"'
         out.append(f'<tr{tr_style}>')
-        for c in cols:
-            val = r.get(c, '')
-            if pd.isna(val):
-                val = ''
-            display_html = ''
-            if c == 'TeamName':
-                # inline logo + team name
-                logo_html = inline_logo_for_team(val, height=20)
-                display_html = f"{logo_html}{html.escape(str(val))}"
-            else:
-                if isinstance(val, float):
-                    if c == 'prediction' or c == 'SecondsBehindPredWinner_s':
-                        val = f'{val:.3f}'
-                display_html = html.escape(str(val))
-            out.append(f'<td>{display_html}</td>')
+        out.extend(cells[c][i] for c in cols)
         out.append('</tr>')
     out.append('</tbody></table>')
     return '\n'.join(out)
@@ -209,38 +235,12 @@ else:
 html_parts.append('<h2>Predicted finishing order (top to bottom)</h2>')
 html_parts.append(make_table_html(df_sorted))
 
-# Inline team logos into a small summary above the table
-logo_base = ROOT / 'assets' / 'logos'
-def inline_logo_for_team(team_name):
-    if not team_name or pd.isna(team_name):
-        return ''
-    # prefer png, then svg (case-insensitive)
-    safe = ''.join([ch for ch in str(team_name) if ch.isalnum() or ch in (' ','-')]).replace(' ','_')
-    candidates = [logo_base / (safe + ext) for ext in ('.png', '.PNG', '.svg', '.SVG')]
-    fname = None
-    for p in candidates:
-        if p.exists():
-            fname = p
-            break
-    if fname is None:
-        return ''
-    try:
-        data = fname.read_bytes()
-        b64 = base64.b64encode(data).decode('ascii')
-        if fname.suffix.lower() == '.svg':
-            mime = 'image/svg+xml'
-        else:
-            mime = 'image/png'
-        return f'<img src="data:{mime};base64,{b64}" style="height:28px;vertical-align:middle;margin-right:6px">'
-    except Exception:
-        return ''
-
 # Winner display
 winner_name = ''
 if not df_sorted.empty and 'Driver' in df_sorted.columns:
     winner_name = str(df_sorted.iloc[0]['Driver'])
     winner_team = df_sorted.iloc[0].get('TeamName', '')
-    winner_logo = inline_logo_for_team(winner_team)
+    winner_logo = inline_logo_for_team(winner_team, height=28)
     html_parts.insert(6, f'<h2>Predicted winner: {winner_logo} {html.escape(str(winner_name))} — {html.escape(str(winner_team))}</h2>')
 
 html_parts.append('<h2>Notes</h2>')
@@ -250,7 +250,9 @@ html_parts.append('<p>"Seconds behind predicted winner" is non-negative; lower v
 html_parts.append('</body></html>')
 
 out_file = OUT / 'prediction_singapore_report.html'
-with open(out_file, 'w') as fh:
-    fh.write('\n'.join(html_parts))
+# stream the parts instead of joining them into one large string first
+with open(out_file, 'w', encoding='utf-8') as fh:
+    fh.write(html_parts[0])
+    fh.writelines('\n' + part for part in html_parts[1:])
 
 print('Wrote report to', out_file)
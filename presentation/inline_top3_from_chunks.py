@@ -1,5 +1,4 @@
 #!/usr/bin/env python3
-import re
 from pathlib import Path
 
 root = Path(__file__).parent
@@ -11,25 +10,38 @@ if not chunks_file.exists():
 if not html_file.exists():
     raise SystemExit(f"missing {html_file}")
 
-# Reassemble data URI
-with chunks_file.open('r', encoding='utf-8') as f:
-    lines = [ln.rstrip('\n') for ln in f]
-
-# Some chunk files may include backticks or code fences if created incorrectly; drop them
-clean_lines = [ln for ln in lines if not ln.strip().startswith('```')]
-full = ''.join(clean_lines)
+# Reassemble data URI, reusing the assembled copy while the chunk file is unchanged
+cache_file = root / '.top3_datauri.cache'
+mtime = str(chunks_file.stat().st_mtime_ns)
+full = None
+if cache_file.exists():
+    cached_key, _, cached_uri = cache_file.read_text(encoding='utf-8').partition('\n')
+    if cached_key == mtime:
+        full = cached_uri
+if full is None:
+    # Some chunk files may include backticks or code fences if created incorrectly; drop them.
+    # Work on bytes and decode once at the end.
+    lines = chunks_file.read_bytes().split(b'\n')
+    full = b''.join(ln for ln in lines if not ln.strip().startswith(b'```')).decode('utf-8')
+    cache_file.write_text(f"{mtime}\n{full}", encoding='utf-8')
 
 # Read HTML and replace the Top 3 image src
 html = html_file.read_text(encoding='utf-8')
 
-# We look for the img tag inside the Top 3 section that has the distinctive style attribute
-pattern = re.compile(r'(<img\s+src=")[^"]*("\s+width="900"\s+style="border-radius:6px;box-shadow:0 6px 18px rgba\(0,0,0,0.12\)">)', re.DOTALL)
-
-new_html, n = pattern.subn(r"\1" + full + r"\2", html, count=1)
-if n == 0:
-    # fallback: replace the first occurrence of the top3-local image reference
-    pattern2 = re.compile(r'(<img\s+src=")[^"]*("\s+width="900"\s+style="border-radius:6px;box-shadow:0 6px 18px rgba\(0,0,0,0.12\)">)', re.DOTALL)
-    new_html, n = pattern2.subn(r"\1" + full + r"\2", html, count=1)
+# We look for the img tag inside the Top 3 section that has the distinctive style attribute:
+# find its fixed tail, then walk back to the opening `<img src="` and splice in the data URI
+IMG_OPEN = '<img src="'
+RIGHT_ANCHOR = '" width="900" style="border-radius:6px;box-shadow:0 6px 18px rgba(0,0,0,0.12)">'
+
+n = 0
+new_html = html
+end = html.find(RIGHT_ANCHOR)
+if end != -1:
+    start = html.rfind(IMG_OPEN, 0, end)
+    # the old src must be a single attribute value (no quote inside it)
+    if start != -1 and '"' not in html[start + len(IMG_OPEN):end]:
+        new_html = html[:start] + IMG_OPEN + full + html[end:]
+        n = 1
 
 if n == 0:
     raise SystemExit('failed to find target <img> tag to replace')
@@ -7,36 +7,60 @@ Reads:
 
 Writes:
 - artifacts/top3_headshots.png
+- artifacts/headshot_cache/ (downloaded headshots, reused on later runs)
 
 This script is defensive: if a headshot cannot be downloaded it draws a placeholder with initials.
 """
+import functools
+import hashlib
 import io
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 
 import numpy as np
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 import matplotlib.pyplot as plt
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, ImageOps
 
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 ARTIFACTS = os.path.join(ROOT, 'artifacts')
 os.makedirs(ARTIFACTS, exist_ok=True)
+# downloaded headshots, keyed by a hash of the URL, so re-runs skip the network
+HEADSHOT_CACHE = os.path.join(ARTIFACTS, 'headshot_cache')
+
+# pooled keep-alive session shared by the download threads
+SESSION = requests.Session()
+SESSION.headers.update({'User-Agent': 'Mozilla/5.0 (compatible; Formula1Report/1.0)'})
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+SESSION.mount('http://', _adapter)
+SESSION.mount('https://', _adapter)
 
 
 def fetch_image_bytes(url, timeout=6.0):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (compatible; Formula1Report/1.0)'
-    }
+    if not (isinstance(url, str) and url.lower().startswith('http')):
+        return None
+    cached = os.path.join(HEADSHOT_CACHE, hashlib.sha1(url.encode('utf-8')).hexdigest())
+    if os.path.exists(cached):
+        with open(cached, 'rb') as fh:
+            return fh.read()
     try:
-        r = requests.get(url, headers=headers, timeout=timeout)
+        r = SESSION.get(url, timeout=timeout)
         r.raise_for_status()
-        return r.content
     except Exception:
         return None
+    try:
+        os.makedirs(HEADSHOT_CACHE, exist_ok=True)
+        with open(cached + '.tmp', 'wb') as fh:
+            fh.write(r.content)
+        os.replace(cached + '.tmp', cached)
+    except OSError:
+        pass
+    return r.content
 
 
 def read_image_from_bytes(bts):
@@ -47,30 +71,33 @@ def read_image_from_bytes(bts):
         return None
 
 
+@functools.lru_cache(maxsize=None)
+def load_font(px):
+    # try to load a system font once per pixel size
+    try:
+        return ImageFont.truetype('Arial.ttf', px)
+    except Exception:
+        return ImageFont.load_default()
+
+
+def text_size(draw, text, font):
+    # textbbox replaces ImageDraw.textsize, which was removed in Pillow 10
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    return right - left, bottom - top
+
+
 def make_placeholder(initials, size=512, bg_color='#dddddd', fg_color='#333333'):
     img = Image.new('RGBA', (size, size), bg_color)
     draw = ImageDraw.Draw(img)
-    try:
-        # try to load a system font
-        font = ImageFont.truetype('Arial.ttf', int(size * 0.36))
-    except Exception:
-        font = ImageFont.load_default()
-    w, h = draw.textsize(initials, font=font)
+    font = load_font(int(size * 0.36))
+    w, h = text_size(draw, initials, font)
     draw.text(((size - w) / 2, (size - h) / 2), initials, font=font, fill=fg_color)
     return img
 
 
 def circle_crop(pil_img, size=512):
-    # Resize and center-crop using Pillow, then apply circular mask
-    img = pil_img.convert('RGBA')
-    w, h = img.size
-    scale = size / max(w, h)
-    new_w, new_h = int(round(w * scale)), int(round(h * scale))
-    img = img.resize((new_w, new_h), Image.LANCZOS)
-    # center crop to square
-    left = max(0, (new_w - size) // 2)
-    top = max(0, (new_h - size) // 2)
-    img = img.crop((left, top, left + size, top + size))
+    # Scale and center-crop to a square in one Pillow pass, then apply circular mask
+    img = ImageOps.fit(pil_img.convert('RGBA'), (size, size), Image.LANCZOS, centering=(0.5, 0.5))
     # circular mask
     mask = Image.new('L', (size, size), 0)
     draw = ImageDraw.Draw(mask)
@@ -80,6 +107,7 @@ def circle_crop(pil_img, size=512):
     return out
 
 
+@functools.lru_cache(maxsize=256)
 def initials_from_name(name):
     if not isinstance(name, str) or not name.strip():
         return '??'
@@ -95,12 +123,9 @@ def draw_flag_badge(base_img, country_code, size=64, margin=8):
     badge_h = int(size * 0.6)
     badge = Image.new('RGBA', (badge_w, badge_h), (255, 255, 255, 220))
     d = ImageDraw.Draw(badge)
-    try:
-        font = ImageFont.truetype('Arial.ttf', int(badge_h * 0.5))
-    except Exception:
-        font = ImageFont.load_default()
+    font = load_font(int(badge_h * 0.5))
     txt = (country_code or '').upper()[:3]
-    w, h = d.textsize(txt, font=font)
+    w, h = text_size(d, txt, font)
     d.text(((badge_w - w) / 2, (badge_h - h) / 2), txt, fill='#111111', font=font)
     # paste badge onto bottom-right of base_img
     bw, bh = base_img.size
@@ -137,14 +162,18 @@ def main():
     for c in candidates:
         if os.path.exists(c):
             try:
-                df = pd.read_csv(c)
-                if 'FullName' in df.columns and 'HeadshotUrl' in df.columns:
-                    for _, r in df[['FullName', 'HeadshotUrl']].dropna().iterrows():
-                        shot_map[str(r['FullName']).strip()] = r['HeadshotUrl']
+                # only the key/url columns are needed from these wide CSVs
+                df = pd.read_csv(c, usecols=lambda col: col in ('FullName', 'DriverId', 'HeadshotUrl'))
+                if 'HeadshotUrl' in df.columns:
+                    for key in ('FullName', 'DriverId'):
+                        if key in df.columns:
+                            sub = df[[key, 'HeadshotUrl']].dropna()
+                            shot_map.update(zip(sub[key].astype(str).str.strip(), sub['HeadshotUrl']))
             except Exception:
                 pass
 
-    images = []
+    rows = []
+    urls = []
     for _, r in top3.iterrows():
         full = r.get('FullName') or r.get('Driver')
         url = None
@@ -153,12 +182,18 @@ def main():
         # sometimes DriverId or abbreviation is available
         if not url and 'DriverId' in r and pd.notna(r['DriverId']):
             url = shot_map.get(r['DriverId'])
+        rows.append((full, r))
+        urls.append(url)
 
+    # fetch all headshots concurrently (collapses the per-driver round trips)
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        bytes_list = list(ex.map(fetch_image_bytes, urls))
+
+    images = []
+    for (full, r), bts in zip(rows, bytes_list):
         img = None
-        if isinstance(url, str) and url.lower().startswith('http'):
-            bts = fetch_image_bytes(url)
-            if bts:
-                img = read_image_from_bytes(bts)
+        if bts:
+            img = read_image_from_bytes(bts)
 
         if img is None:
             initials = initials_from_name(full)
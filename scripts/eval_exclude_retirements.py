@@ -4,6 +4,7 @@ Usage: python scripts/eval_exclude_retirements.py
 """
 from __future__ import annotations
 import json
+import re
 from pathlib import Path
 import pandas as pd
 import numpy as np
@@ -12,15 +13,19 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 from sklearn.impute import SimpleImputer
 
+_RET_RE = re.compile(r'retir|rtd|dnf', re.IGNORECASE)
+
 
 def detect_retirement(df: pd.DataFrame) -> pd.Series:
     # Detect retirements by ClassifiedPosition starting with 'R' (user requested: remove the R's)
     if 'ClassifiedPosition' in df.columns:
-        return df['ClassifiedPosition'].astype(str).str.upper().str.startswith('R')
+        # first-character test; avoids building an uppercased copy of the column
+        first = df['ClassifiedPosition'].astype(str).str[:1]
+        return (first == 'R') | (first == 'r')
     # fallback to Status-based detection if ClassifiedPosition not present
     status = df.get('Status')
     if status is not None:
-        return status.astype(str).str.lower().str.contains('retir|rtd|dnf', na=False)
+        return status.astype(str).str.contains(_RET_RE, na=False)
     return pd.Series(False, index=df.index)
 
 
@@ -36,39 +41,42 @@ def choose_target(df: pd.DataFrame) -> str:
 
 
 def run_experiment(csv_path: str | Path) -> dict:
-    df = pd.read_csv(csv_path)
+    try:
+        df = pd.read_csv(csv_path, engine='pyarrow')
+    except ImportError:
+        df = pd.read_csv(csv_path, low_memory=False)
     # retirement mask on the raw CSV (before any target-based dropping)
     raw_ret_mask = detect_retirement(df)
     raw_ret_count = int(raw_ret_mask.sum())
 
+    # resolved once; eval_on_df and the retirement summary below reuse it
     target = choose_target(df)
 
+    # numeric feature selection (sort=False keeps the CSV column order)
+    num_cols = df.select_dtypes(include=[np.number]).columns.difference(
+        ['Unnamed: 0', 'DriverId', 'Driver', 'FullName', target], sort=False).tolist()
+    # drop numeric columns with no observed values among rows with a target
+    has_target = df[target].notnull()
+    feat_cols = df.loc[has_target, num_cols].dropna(axis=1, how='all').columns.tolist()
+
+    # fit the median imputer once on all rows with a target; the baseline and
+    # filtered runs both reuse it instead of re-fitting per run. Features go in
+    # as float32 ndarrays: the trees cast to float32 internally anyway
+    imp = SimpleImputer(strategy='median')
+    imp.fit(df.loc[has_target, feat_cols].to_numpy(dtype=np.float32))
+
     # helper: evaluate model on an input dataframe
     def eval_on_df(local_df: pd.DataFrame) -> dict:
-        # numeric feature selection
-        num_cols = local_df.select_dtypes(include=[np.number]).columns.tolist()
-        if target in num_cols:
-            num_cols.remove(target)
-        for rm in ('Unnamed: 0', 'DriverId', 'Driver', 'FullName'):
-            if rm in num_cols:
-                num_cols.remove(rm)
-
-        X = local_df[num_cols].copy()
-        y = local_df[target].copy()
+        y = local_df[target]
         mask_valid = y.notnull()
-        X = X.loc[mask_valid]
-        y = y.loc[mask_valid]
-
-        # drop numeric columns with no observed values
-        X = X.dropna(axis=1, how='all')
-        imp = SimpleImputer(strategy='median')
-        X_imp = pd.DataFrame(imp.fit_transform(X), columns=X.columns, index=X.index)
+        X_imp = imp.transform(local_df.loc[mask_valid, feat_cols].to_numpy(dtype=np.float32))
+        y = y.loc[mask_valid].to_numpy()
 
         # train/eval
         if len(y) < 10:
             return {'n_rows': int(len(y)), 'rmse': None, 'mae': None}
         X_tr, X_te, y_tr, y_te = train_test_split(X_imp, y, test_size=0.25, random_state=42)
-        m = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=2)
+        m = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
         m.fit(X_tr, y_tr)
         pred = m.predict(X_te)
         return {
@@ -97,9 +105,7 @@ def run_experiment(csv_path: str | Path) -> dict:
 
     # Also report how many retirements remained after target-based filtering for baseline
     # (i.e. retirements that had a valid target and thus were in baseline rows)
-    target = choose_target(df)
-    baseline_target_mask = df[target].notnull()
-    retirements_with_target = int((raw_ret_mask & baseline_target_mask).sum())
+    retirements_with_target = int((raw_ret_mask & has_target).sum())
     results['retirements_with_target'] = retirements_with_target
 
     return results
@@ -3,7 +3,9 @@
 
 Creates files under assets/logos/<TeamName_sanitized>.png
 """
+from functools import lru_cache
 from pathlib import Path
+import re
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
@@ -18,7 +20,11 @@ if not raw.exists():
     print('premodeldatav1.csv not found; cannot infer teams')
     raise SystemExit(1)
 
-df = pd.read_csv(raw)
+# only TeamName is needed; probe the header so a missing column is reported below
+if 'TeamName' in pd.read_csv(raw, nrows=0).columns:
+    df = pd.read_csv(raw, usecols=['TeamName'])
+else:
+    df = pd.DataFrame()
 if 'TeamName' not in df.columns:
     print('No TeamName column found; nothing to do')
     raise SystemExit(0)
@@ -26,16 +32,22 @@ if 'TeamName' not in df.columns:
 teams = sorted(df['TeamName'].dropna().unique())
 cmap = plt.get_cmap('tab20')
 
+# anything that is not alphanumeric, space or hyphen (\w also admits '_', so drop it explicitly)
+_UNSAFE = re.compile(r'[^\w \-]|_')
+
+@lru_cache(maxsize=None)
 def sanitize(name):
-    return ''.join([c for c in name if c.isalnum() or c in (' ', '-')]).replace(' ', '_')
+    return _UNSAFE.sub('', name).replace(' ', '_')
 
+# one figure is reused for every team; only the circle and initials change
+fig, ax = plt.subplots(figsize=(2,2))
 for i, t in enumerate(teams):
     color = cmap(i % 20)
-    fig, ax = plt.subplots(figsize=(2,2))
+    ax.clear()
     ax.add_patch(plt.Circle((0.5,0.5), 0.4, color=color))
     ax.text(0.5, 0.5, ''.join([w[0] for w in t.split()][:2]).upper(), ha='center', va='center', fontsize=20, color='white')
     ax.axis('off')
     out = LOGO_DIR / (sanitize(t) + '.png')
     fig.savefig(out, dpi=150, bbox_inches='tight', pad_inches=0)
-    plt.close(fig)
     print('Wrote', out)
+plt.close(fig)
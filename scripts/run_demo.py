@@ -2,14 +2,21 @@
 """Run a small demo: score canonical fixture, update manifest, generate presentation.
 
 Usage: python3 scripts/run_demo.py
+
+Stages run in this interpreter (pandas/sklearn/xgboost are imported once);
+a stage whose module cannot be imported falls back to a subprocess.
 """
 from pathlib import Path
+import runpy
 import subprocess
 import sys
 
 ROOT = Path(__file__).resolve().parents[1]
 ART = ROOT / 'artifacts'
 FIX = ROOT / 'tests' / 'fixtures' / 'canonical_sample.csv'
+# artifacts/ is imported as a namespace package, the same way serve/app.py does
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
 
 def run(cmd):
     print('RUN:', ' '.join(cmd))
@@ -23,13 +30,27 @@ def main():
         raise SystemExit(1)
 
     # score
-    run([sys.executable, str(ART / 'score_model.py'), '--input', str(FIX), '--output', str(ART / 'scored_demo.csv')])
+    out = ART / 'scored_demo.csv'
+    try:
+        from artifacts import score_model
+    except ImportError:
+        run([sys.executable, str(ART / 'score_model.py'), '--input', str(FIX), '--output', str(out)])
+    else:
+        print('RUN: score_model.score', FIX, '->', out)
+        score_model.score(FIX, out)
 
     # update manifest
-    run([sys.executable, str(ART / 'update_manifest.py')])
-
-    # generate presentation
-    run([sys.executable, str(ROOT / 'presentation' / 'generate_presentation.py')])
+    try:
+        from artifacts import update_manifest
+    except ImportError:
+        run([sys.executable, str(ART / 'update_manifest.py')])
+    else:
+        print('RUN: update_manifest.scan_artifacts')
+        update_manifest.scan_artifacts()
+
+    # generate presentation (a top-level script, so execute it as __main__)
+    print('RUN: presentation/generate_presentation.py')
+    runpy.run_path(str(ROOT / 'presentation' / 'generate_presentation.py'), run_name='__main__')
 
     print('\nDemo complete. Presentation available at presentation/index.html and artifacts/manifest.json')
 
@@ -5,6 +5,8 @@ Usage:
   python3 scripts/run_score_and_metrics.py --input premodeldatav1.csv
 
 This is a tiny helper to run the scorer and show where artifacts are saved.
+The scorer is imported and called in-process; if it cannot be imported it is
+run in a subprocess instead.
 """
 import argparse
 import subprocess
@@ -13,16 +15,25 @@ import sys
 
 ROOT = Path(__file__).resolve().parents[1]
 ART = ROOT / 'artifacts'
+# artifacts/ is imported as a namespace package, the same way serve/app.py does
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
 
 if __name__ == '__main__':
     ap = argparse.ArgumentParser()
     ap.add_argument('--input', required=True)
     ap.add_argument('--output', default=str(ART / 'scored_preds_from_raw.csv'))
     args = ap.parse_args()
-    cmd = [sys.executable, str(ART / 'score_model.py'), '--input', args.input, '--output', args.output]
-    res = subprocess.run(cmd)
-    if res.returncode != 0:
-        sys.exit(res.returncode)
+    try:
+        from artifacts import score_model
+    except ImportError:
+        cmd = [sys.executable, str(ART / 'score_model.py'), '--input', args.input, '--output', args.output]
+        res = subprocess.run(cmd)
+        if res.returncode != 0:
+            sys.exit(res.returncode)
+    else:
+        score_model.score(Path(args.input), Path(args.output))
     print('Wrote calibrated predictions to', args.output)
     print('Uncalibrated predictions:', ART / 'scored_preds_from_raw_uncalibrated.csv')
     print('Metrics (uncalibrated):', ART / 'metrics_scored_from_raw_uncalibrated.csv')
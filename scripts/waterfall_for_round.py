@@ -4,34 +4,183 @@
 Usage:
   python3 scripts/waterfall_for_round.py            # picks the first round found
   python3 scripts/waterfall_for_round.py --round 5  # pick Round==5
+  python3 scripts/waterfall_for_round.py --all      # one chart per round, reusing a single figure
 """
 from pathlib import Path
 import argparse
 import subprocess
 import sys
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
 
 ROOT = Path(__file__).resolve().parents[1]
 ART = ROOT / 'artifacts'
+# artifacts/ is imported as a namespace package, the same way serve/app.py does
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
 OUT = ROOT / 'presentation'
 OUT.mkdir(exist_ok=True)
 
+# declared up front so Arrow skips type inference for the columns used below
+# (types for columns absent from a file are ignored)
+COLUMN_TYPES = {'Round': 'string', 'GridPosition': 'double', 'prediction': 'float32'}
+# the only raw columns the chart uses
+RAW_COLUMNS = ['Round', 'RoundNumber', 'GridPosition', 'Driver', 'DriverNumber', 'TeamName']
+# label parts that count as absent ('nan' is how astype(str) renders a missing value)
+MISSING_TOKENS = ('nan', '')
+
+
+def read_csv(path, usecols=None):
+    """Read a CSV with pyarrow's multi-threaded parser, falling back to pandas.
+
+    usecols limits the read to those columns (names missing from the file are skipped).
+    """
+    if usecols is not None:
+        header = pd.read_csv(path, nrows=0).columns
+        usecols = [c for c in usecols if c in header]
+    if pa is None:
+        return pd.read_csv(path, usecols=usecols)
+    opts = pacsv.ConvertOptions(column_types={c: pa.type_for_alias(t) for c, t in COLUMN_TYPES.items()},
+                                include_columns=usecols)
+    return pacsv.read_csv(path, convert_options=opts).to_pandas()
+
+
 def ensure_predictions():
     pred_file = ART / 'scored_preds_from_raw.csv'
     # if not present, try to run scorer on the main premodel CSV
     if not pred_file.exists():
         print('scored_preds_from_raw.csv not found — running scorer on premodeldatav1.csv')
-        cmd = [sys.executable, str(ART / 'score_model.py'), '--input', str(ROOT / 'premodeldatav1.csv'), '--output', str(ART / 'scored_preds_from_raw.csv')]
-        rc = subprocess.call(cmd)
-        if rc != 0:
-            raise SystemExit('scoring failed')
+        try:
+            from artifacts import score_model
+        except ImportError:
+            cmd = [sys.executable, str(ART / 'score_model.py'), '--input', str(ROOT / 'premodeldatav1.csv'), '--output', str(pred_file)]
+            rc = subprocess.call(cmd)
+            if rc != 0:
+                raise SystemExit('scoring failed')
+        else:
+            score_model.score(ROOT / 'premodeldatav1.csv', pred_file)
     return pred_file
 
 
+def _col(df, c):
+    """df[c] as strings, or empty strings when the column is absent (default built only when needed)."""
+    if c in df.columns:
+        return df[c].astype(str)
+    return pd.Series([''] * len(df), index=df.index)
+
+
+def round_mask(col, sel):
+    """Boolean mask of rows whose Round equals the string sel, without stringifying a numeric column."""
+    if pd.api.types.is_numeric_dtype(col):
+        val = pd.to_numeric(sel, errors='coerce')
+        if pd.notna(val):
+            return col == val
+        return col.astype(str) == sel
+    # pyarrow reads Round as strings already (COLUMN_TYPES)
+    return col == sel
+
+
+def render_round(fig, ax, merged, sel):
+    """Draw the waterfall for one round onto the (reused) axes and save it; returns the PNG path.
+
+    Raises ValueError when the round has no rows or no GridPosition column.
+    """
+    df_round = merged[round_mask(merged['Round'], str(sel))]
+    if df_round.empty:
+        raise ValueError(f'No rows for round {sel}')
+
+    # require GridPosition and prediction
+    if 'GridPosition' not in df_round.columns:
+        raise ValueError(f'GridPosition column missing for round {sel}')
+
+    # Use prediction as DeviationFromAvg_s proxy
+    pred_dev = df_round['prediction'].to_numpy(dtype=float)
+
+    # order by predicted deviation (ranked: best/smallest first); only the plotted arrays are reordered
+    order = np.argsort(pred_dev, kind='stable')
+
+    # prepare labels and colors
+    # Build a disambiguated driver label: Name (#) - Team (if available)
+    names = _col(df_round, 'Driver')
+    numbers = _col(df_round, 'DriverNumber')
+    teams = _col(df_round, 'TeamName')
+    # vectorized ' '.join of the non-empty parts; falls back to the number (or name) when none are set
+    valid_nm = ~names.isin(MISSING_TOKENS)
+    valid_num = ~numbers.isin(MISSING_TOKENS)
+    valid_team = ~teams.isin(MISSING_TOKENS)
+    label = (names.where(valid_nm, '')
+             + (' #' + numbers).where(valid_num, '')
+             + (' -' + teams).where(valid_team, ''))
+    # drop the separator in front of the first part when there is no name
+    label = label.where(valid_nm, label.str[1:])
+    label = label.where(valid_nm | valid_num | valid_team, numbers.where(numbers.ne(''), names))
+    driver_label = label.to_numpy()[order].tolist()
+    # a missing (or non-numeric) grid slot is shown as '?'; fractional values are rounded before the int cast
+    grid = pd.to_numeric(df_round['GridPosition'], errors='coerce').round().astype('Int64')
+    grid_labels = grid.astype(str).replace('<NA>', '?').to_numpy()[order]
+    values = pred_dev[order]
+    colors = np.where(values > 0, 'red', 'green')
+    xs = np.arange(len(values))
+
+    ax.clear()
+    ax.bar(xs, values, color=colors)
+    ax.axhline(0, color='k', linewidth=0.6)
+    ax.set_xticks(xs)
+    ax.set_xticklabels(driver_label, rotation=45, ha='right')
+    ax.set_xlabel('Driver')
+    ax.set_ylabel('Predicted DeviationFromAvg_s')
+    ax.set_title(f'Predicted DeviationFromAvg_s — Round {sel} (drivers ordered by prediction)')
+
+    # annotate grid position above each bar (or below if negative); offsets computed up front
+    pos = values >= 0
+    offset = np.maximum(0.02, 0.01 * np.abs(values))
+    ys = np.where(pos, values + offset, values - offset)
+    vas = np.where(pos, 'bottom', 'top')
+    for x, y, va, g in zip(xs.tolist(), ys.tolist(), vas.tolist(), grid_labels.tolist()):
+        ax.text(x, y, f'Grid: {g}', ha='center', va=va, fontsize=8, rotation=0)
+
+    outpng = OUT / f'waterfall_round_{sel}.png'
+    fig.savefig(outpng, bbox_inches='tight')
+    return outpng
+
+
+def render_all_rounds(merged, rounds):
+    """Render one waterfall per round, reusing a single figure between rounds.
+
+    Rounds that cannot be drawn are reported and skipped; returns the PNG paths written.
+    """
+    # deferred so argparse/--help does not pay for matplotlib; Agg since we only write PNGs
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    # constrained layout is solved at draw time, so no tight_layout pass is needed per round
+    fig, ax = plt.subplots(figsize=(14,5), layout='constrained')
+    written = []
+    try:
+        for sel in rounds:
+            try:
+                outpng = render_round(fig, ax, merged, sel)
+            except ValueError as e:
+                print('Skipping round', sel, '-', e)
+                continue
+            print('Wrote', outpng)
+            written.append(outpng)
+    finally:
+        plt.close(fig)
+    return written
+
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument('--round', type=str, help='Round identifier to plot (matches values in raw file)')
+    p.add_argument('--all', action='store_true', help='Plot every round found in the data')
     args = p.parse_args()
 
     pred_file = ensure_predictions()
@@ -39,8 +188,9 @@ def main():
     if not raw_file.exists():
         raise SystemExit('raw premodeldatav1.csv missing')
 
-    pred = pd.read_csv(pred_file)
-    raw = pd.read_csv(raw_file).reset_index()
+    pred = read_csv(pred_file)
+    # positional 'index' matches the scorer's output index; only the used columns are parsed
+    raw = read_csv(raw_file, usecols=RAW_COLUMNS).reset_index()
     merged = pred.merge(raw, left_on='index', right_on='index', how='left')
 
     if 'Round' in merged.columns:
@@ -50,9 +200,15 @@ def main():
     else:
         rounds = [None]
 
+    if args.all:
+        if rounds == [None]:
+            raise SystemExit('No round information in raw data')
+        render_all_rounds(merged, [str(r) for r in rounds])
+        return
+
     if args.round:
         sel = args.round
-        if sel not in [str(r) for r in rounds]:
+        if sel not in {str(r) for r in rounds}:
             print('Requested round not found in data. Available rounds:', rounds)
             raise SystemExit(1)
     else:
@@ -62,69 +218,9 @@ def main():
     if sel is None:
         raise SystemExit('No round information in raw data')
 
-    df_round = merged[merged['Round'].astype(str) == str(sel)].copy()
-    if df_round.empty:
-        print('No rows for round', sel)
+    if not render_all_rounds(merged, [sel]):
         raise SystemExit(1)
 
-    # require GridPosition and prediction
-    if 'GridPosition' not in df_round.columns:
-        raise SystemExit('GridPosition column missing for selected round')
-
-    # Use prediction as DeviationFromAvg_s proxy
-    df_round['pred_dev'] = df_round['prediction'].astype(float)
-
-    # order by predicted deviation (ranked: best/smallest first)
-    df_round = df_round.sort_values('pred_dev', ascending=True).reset_index(drop=True)
-
-    # prepare labels and colors
-    # Build a disambiguated driver label: Name (#) - Team (if available)
-    names = df_round.get('Driver', pd.Series(['']*len(df_round))).astype(str)
-    numbers = df_round.get('DriverNumber', pd.Series(['']*len(df_round))).astype(str)
-    teams = df_round.get('TeamName', pd.Series(['']*len(df_round))).astype(str)
-    def make_label(nm, num, team):
-        parts = []
-        if nm and nm != 'nan':
-            parts.append(nm)
-        if num and num != 'nan':
-            parts.append('#' + num)
-        if team and team != 'nan':
-            parts.append('-' + team)
-        if parts:
-            return ' '.join(parts)
-        return num or nm
-    driver_label = [make_label(nm, num, t) for nm, num, t in zip(names, numbers, teams)]
-    grid_labels = df_round['GridPosition'].astype(int).astype(str)
-    values = df_round['pred_dev'].values
-    colors = ['red' if v>0 else 'green' for v in values]
-
-    plt.figure(figsize=(14,5))
-    bars = plt.bar(range(len(values)), values, color=colors)
-    plt.axhline(0, color='k', linewidth=0.6)
-    plt.xticks(range(len(values)), driver_label, rotation=45, ha='right')
-    plt.xlabel('Driver')
-    plt.ylabel('Predicted DeviationFromAvg_s')
-    plt.title(f'Predicted DeviationFromAvg_s — Round {sel} (drivers ordered by prediction)')
-
-    # annotate grid position above each bar
-    for i, b in enumerate(bars):
-        h = b.get_height()
-        # place annotation slightly above the bar (or below if negative)
-        if h >= 0:
-            va = 'bottom'
-            y = h + max(0.02, 0.01 * abs(h))
-        else:
-            va = 'top'
-            y = h - max(0.02, 0.01 * abs(h))
-        plt.text(b.get_x() + b.get_width()/2, y, f'Grid: {grid_labels.iloc[i]}', ha='center', va=va, fontsize=8, rotation=0)
-
-    plt.tight_layout()
-    outpng = OUT / f'waterfall_round_{sel}.png'
-    plt.savefig(outpng, bbox_inches='tight')
-    plt.close()
-
-    print('Wrote', outpng)
-
 
 if __name__ == '__main__':
     main()
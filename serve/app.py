@@ -1,46 +1,88 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from pathlib import Path
 import shutil
-import subprocess
 import sys
-import json
+import tempfile
+import threading
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
 
-ROOT = Path(__file__).resolve().parents[2]
+ROOT = Path(__file__).resolve().parents[1]
 ART = ROOT / 'artifacts'
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# score in-process: the pipeline and models stay loaded between requests
+from artifacts.score_model import score as _score, warmup as _warmup
+
 app = FastAPI(title='Formula1 Scorer')
 
+# score() rewrites fixed files (uncalibrated preds, metrics, scored_from_api.csv),
+# so requests are scored one at a time even though they share the thread pool
+_score_lock = threading.Lock()
+
 class ScoreRequest(BaseModel):
     input_csv: str
 
 
+@app.on_event('startup')
+async def load_models():
+    await run_in_threadpool(_warmup)
+
+
+def _score_serialized(inp: Path, out: Path):
+    with _score_lock:
+        return _score(inp, out)
+
+
+async def run_scoring(inp: Path, out: Path):
+    try:
+        result = await run_in_threadpool(_score_serialized, inp, out)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f'scoring failed: {e}')
+    # score() returns None when no rows are left to score (every driver lapped)
+    if result is None:
+        raise HTTPException(status_code=422, detail='no rows to score after dropping lapped drivers')
+
+
 @app.post('/score')
 async def score(req: ScoreRequest):
     inp = Path(req.input_csv)
     if not inp.exists():
         raise HTTPException(status_code=400, detail='input CSV not found')
     out = ART / 'scored_from_api.csv'
-    cmd = [sys.executable, str(ART / 'score_model.py'), '--input', str(inp), '--output', str(out)]
-    rc = subprocess.call(cmd)
-    if rc != 0:
-        raise HTTPException(status_code=500, detail='scoring failed')
+    await run_scoring(inp, out)
     return {'predictions': str(out)}
 
 
 @app.post('/upload_and_score')
 async def upload_and_score(file: UploadFile = File(...)):
-    tmp = Path('/tmp') / file.filename
-    with open(tmp, 'wb') as fh:
-        content = await file.read()
-        fh.write(content)
+    # stream the upload to a temp file next to the artifacts instead of buffering it in memory
+    fh = tempfile.NamedTemporaryFile(dir=ART, prefix='upload_', suffix='.csv', delete=False)
+    tmp = Path(fh.name)
     out = ART / ('scored_' + file.filename)
-    cmd = [sys.executable, str(ART / 'score_model.py'), '--input', str(tmp), '--output', str(out)]
-    rc = subprocess.call(cmd)
-    if rc != 0:
-        raise HTTPException(status_code=500, detail='scoring failed')
+    try:
+        with fh:
+            await run_in_threadpool(shutil.copyfileobj, file.file, fh, 1 << 20)
+        await run_scoring(tmp, out)
+    finally:
+        tmp.unlink(missing_ok=True)
     return {'predictions': str(out)}
 
 
+# parsed manifest.json, keyed by its mtime so probes don't re-read an unchanged file
+_manifest_cache = {'mtime': None, 'data': None}
+
+
+def load_manifest(manifest: Path):
+    st = manifest.stat()
+    if _manifest_cache['mtime'] != st.st_mtime_ns:
+        _manifest_cache.update(mtime=st.st_mtime_ns, data=_json.loads(manifest.read_bytes()))
+    return _manifest_cache['data']
 
 
 @app.get('/health')
@@ -51,7 +93,7 @@ async def health():
     manifest = ART / 'manifest.json'
     if manifest.exists():
         try:
-            resp['manifest'] = json.loads(manifest.read_text())
+            resp['manifest'] = load_manifest(manifest)
         except Exception:
             resp['manifest'] = {'error': 'manifest unreadable'}
     return resp
@@ -64,7 +106,7 @@ async def version():
     manifest = ART / 'manifest.json'
     if manifest.exists():
         try:
-            data = json.loads(manifest.read_text())
+            data = load_manifest(manifest)
             out['artifacts'] = list(data.get('items', {}).keys())[:20]
         except Exception:
             out['artifacts'] = []
@@ -1,8 +1,19 @@
 import subprocess
 import sys
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import os
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# files the scorer writes into its --output-dir, by run-dict key
+SIDE_OUTPUTS = {
+    'uncalibrated': 'scored_preds_from_raw_uncalibrated.csv',
+    'metrics_uncalibrated': 'metrics_scored_from_raw_uncalibrated.csv',
+    'metrics_calibrated': 'metrics_scored_from_raw_calibrated.csv',
+}
 
 
 def make_test_input(path, rows=None):
@@ -23,27 +34,60 @@ def make_test_input(path, rows=None):
     df.to_csv(path, index=False)
 
 
+def run_scorer(csv_path, out_csv):
+    """Run score_model.py on csv_path and return a dict of its outputs.
+
+    All outputs go to out_csv's directory (--output-dir), so runs never touch artifacts/.
+    stdout/stderr go straight to a log file next to out_csv instead of being captured in memory.
+    Keys: 'rc', 'log', 'scored' (out_csv) and the names in SIDE_OUTPUTS (None when not written).
+    """
+    out_csv = Path(out_csv)
+    out_dir = out_csv.parent
+    cmd = [sys.executable, str(REPO_ROOT / 'artifacts' / 'score_model.py'), '--input', str(csv_path),
+           '--output', str(out_csv), '--output-dir', str(out_dir)]
+    log = out_csv.with_suffix('.log')
+    with open(log, 'wb') as fh:
+        rc = subprocess.call(cmd, stdout=fh, stderr=subprocess.STDOUT)
+    run = {'rc': rc, 'log': log, 'scored': out_csv if out_csv.exists() else None}
+    for k, f in SIDE_OUTPUTS.items():
+        run[k] = out_dir / f if (out_dir / f).exists() else None
+    return run
+
+
+def assert_ran(run):
+    # only read the scorer output when there is a failure to explain
+    if run['rc'] != 0:
+        print(run['log'].read_text(errors='replace'))
+    assert run['rc'] == 0
+
+
+@pytest.fixture(scope='session')
+def scored_default(tmp_path_factory):
+    """Scorer outputs for the default make_test_input() sample, shared by the tests that use it."""
+    tmp = tmp_path_factory.mktemp('scored_default')
+    csv_path = tmp / 'test_input.csv'
+    make_test_input(csv_path)
+    return run_scorer(csv_path, tmp / 'out_preds.csv')
+
+
+def assert_scored(run):
+    assert_ran(run)
+    assert run['scored'] is not None
+    assert run['uncalibrated'] is not None
+    # metrics files created when DeviationFromAvg_s present
+    assert run['metrics_uncalibrated'] is not None
+    assert run['metrics_calibrated'] is not None
+
+
 def run_scorer_and_assert(tmp_path, csv_path=None):
-    repo_root = Path(__file__).resolve().parents[1]
-    artifacts = repo_root / 'artifacts'
     if csv_path is None:
         csv_path = tmp_path / 'test_input.csv'
         make_test_input(csv_path)
-    out_csv = tmp_path / 'out_preds.csv'
-    cmd = [sys.executable, str(repo_root / 'artifacts' / 'score_model.py'), '--input', str(csv_path), '--output', str(out_csv)]
-    res = subprocess.run(cmd, capture_output=True, text=True)
-    print(res.stdout)
-    print(res.stderr)
-    assert res.returncode == 0
-    assert (artifacts / 'scored_preds_from_raw_uncalibrated.csv').exists()
-    assert (artifacts / 'scored_preds_from_raw.csv').exists()
-    # metrics files created when DeviationFromAvg_s present
-    assert (artifacts / 'metrics_scored_from_raw_uncalibrated.csv').exists()
-    assert (artifacts / 'metrics_scored_from_raw_calibrated.csv').exists()
+    assert_scored(run_scorer(csv_path, tmp_path / 'out_preds.csv'))
 
 
-def test_basic_run(tmp_path):
-    run_scorer_and_assert(tmp_path)
+def test_basic_run(scored_default):
+    assert_scored(scored_default)
 
 
 def test_entirely_lapped_input(tmp_path):
@@ -59,12 +103,8 @@ def test_entirely_lapped_input(tmp_path):
     csv = tmp_path / 'all_lapped.csv'
     make_test_input(csv, rows=rows)
     # run scorer; it should not raise but will print a message and return
-    repo_root = Path(__file__).resolve().parents[1]
-    out_csv = tmp_path / 'out_lapped.csv'
-    cmd = [sys.executable, str(repo_root / 'artifacts' / 'score_model.py'), '--input', str(csv), '--output', str(out_csv)]
-    res = subprocess.run(cmd, capture_output=True, text=True)
     # returncode 0 and outputs exist (though metrics may not be created because no rows to score)
-    assert res.returncode == 0
+    assert_ran(run_scorer(csv, tmp_path / 'out_lapped.csv'))
 
 
 def test_missing_pointsprop_and_unusual_rain(tmp_path):
@@ -82,24 +122,17 @@ def test_missing_pointsprop_and_unusual_rain(tmp_path):
     run_scorer_and_assert(tmp_path, csv_path=csv)
 
 
-def test_output_ranges_and_content(tmp_path):
+def test_output_ranges_and_content(scored_default):
     # validate that predictions are finite numbers and within a reasonable range
-    repo_root = Path(__file__).resolve().parents[1]
-    csv = tmp_path / 'test_input.csv'
-    make_test_input(csv)
-    out_csv = tmp_path / 'out_preds.csv'
-    cmd = [sys.executable, str(repo_root / 'artifacts' / 'score_model.py'), '--input', str(csv), '--output', str(out_csv)]
-    res = subprocess.run(cmd, capture_output=True, text=True)
-    assert res.returncode == 0
-    artifacts = repo_root / 'artifacts'
-    # read predictions the scorer wrote in artifacts (these are global), but ensure we only assert on the rows for our test run
-    pred = pd.read_csv(artifacts / 'scored_preds_from_raw.csv')
+    assert_ran(scored_default)
+    # calibrated predictions for this run were written to its own output path
+    pred = pd.read_csv(scored_default['scored'])
     # predictions should be finite and not extreme
-    assert pred['prediction'].apply(lambda v: pd.notna(v) and float('-1e6') < float(v) < float('1e6')).all()
-    # check uncalibrated exists and has same length
-    uncal = pd.read_csv(artifacts / 'scored_preds_from_raw_uncalibrated.csv')
-    # The global artifacts may include previous runs; at minimum ensure uncalibrated has at least one row and match index column presence
-    assert len(uncal) >= 1
+    vals = pred['prediction'].to_numpy(dtype=np.float64)
+    assert np.isfinite(vals).all() and (np.abs(vals) < 1e6).all()
+    # uncalibrated predictions from the same run cover the same rows
+    uncal = pd.read_csv(scored_default['uncalibrated'])
+    assert len(uncal) == len(pred) >= 1
     assert 'prediction' in uncal.columns and 'prediction' in pred.columns
 
 
@@ -125,23 +158,22 @@ def test_regression_on_canonical_sample(tmp_path):
 
     This provides a basic regression guard for future changes.
     """
-    repo_root = Path(__file__).resolve().parents[1]
-    fixture = repo_root / 'tests' / 'fixtures' / 'canonical_sample.csv'
+    fixture = REPO_ROOT / 'tests' / 'fixtures' / 'canonical_sample.csv'
     assert fixture.exists(), 'Canonical fixture missing'
-    out_csv = tmp_path / 'out_canonical.csv'
-    cmd = [sys.executable, str(repo_root / 'artifacts' / 'score_model.py'), '--input', str(fixture), '--output', str(out_csv)]
-    res = subprocess.run(cmd, capture_output=True, text=True)
-    print(res.stdout)
-    print(res.stderr)
-    assert res.returncode == 0
-    # read produced uncalibrated preds
-    unc = pd.read_csv(repo_root / 'artifacts' / 'scored_preds_from_raw_uncalibrated.csv')
+    run = run_scorer(fixture, tmp_path / 'out_canonical.csv')
+    assert_ran(run)
+    # read this run's uncalibrated preds
+    unc = pd.read_csv(run['uncalibrated'], usecols=['prediction'], dtype={'prediction': 'float32'}, engine='c')
     # align by index with fixture
     preds = unc['prediction'].values
-    truth = pd.read_csv(fixture)['DeviationFromAvg_s'].values
-    from sklearn.metrics import mean_squared_error
-    import math
-    mse = mean_squared_error(truth, preds[: len(truth)])
-    rmse = math.sqrt(mse)
+    truth = pd.read_csv(fixture, usecols=['DeviationFromAvg_s'], dtype={'DeviationFromAvg_s': 'float32'}, engine='c')['DeviationFromAvg_s'].values
+    try:
+        from sklearn.metrics import root_mean_squared_error
+    except ImportError:
+        # scikit-learn < 1.4 (environment.yml pins 1.2.3)
+        from sklearn.metrics import mean_squared_error
+        rmse = mean_squared_error(truth, preds[: len(truth)], squared=False)
+    else:
+        rmse = root_mean_squared_error(truth, preds[: len(truth)])
     # threshold set conservatively (20s)
     assert rmse < 20.0, f'RMSE {rmse:.3f} exceeds threshold'
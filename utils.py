@@ -0,0 +1,124 @@
+"""Shared helpers for the FastF1 data-collection scripts."""
+import functools
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+LAPS_CACHE_DIR = Path("laps_cache")
+
+# parquet schema-metadata key holding the _csv_key of the CSV a copy was written with
+PARQUET_KEY = b"source_csv"
+
+# Small integer key columns shared by the race/quali/weather tables
+KEY_COLUMNS = ('Season', 'Round', 'RoundNumber', 'DriverNumber')
+
+# Low-cardinality driver/compound code columns stored as category
+CATEGORY_COLUMNS = ('Driver', 'Abbreviation', 'Compound')
+
+# Columns the scripts actually read from session.laps
+LAPS_COLUMNS = ['Driver', 'Stint', 'Compound', 'LapNumber', 'PitTime', 'PitInTime', 'PitOutTime', 'DriverNumber']
+
+
+def read_laps(season: int, round_number: int, session_type: str = 'R') -> pd.DataFrame:
+    """
+    Return the laps of one session, restricted to LAPS_COLUMNS.
+
+    FastF1's own cache stores the raw API payloads but still re-parses them on
+    every session.load(); this keeps the parsed laps as parquet under
+    LAPS_CACHE_DIR keyed by (season, round, session). Nothing is kept in
+    memory, so use this for one-pass loops; load_laps adds an in-process cache.
+    """
+    path = LAPS_CACHE_DIR / f"{season}_{round_number}_{session_type}.parquet"
+    if path.exists():
+        return pd.read_parquet(path)
+
+    import fastf1  # deferred so table-only scripts do not need fastf1 installed
+
+    session = fastf1.get_session(season, round_number, session_type)
+    session.load(laps=True, telemetry=False, weather=False, messages=False)
+    laps = pd.DataFrame(session.laps)
+    laps = laps[[c for c in LAPS_COLUMNS if c in laps.columns]].reset_index(drop=True)
+
+    # write to a temp name first so concurrent readers never see a partial file
+    LAPS_CACHE_DIR.mkdir(exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    laps.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    return laps
+
+
+@functools.lru_cache(maxsize=None)
+def load_laps(season: int, round_number: int, session_type: str = 'R') -> pd.DataFrame:
+    """read_laps plus an in-process lru_cache. Callers must not mutate the returned frame."""
+    return read_laps(season, round_number, session_type)
+
+
+def downcast_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """Downcast KEY_COLUMNS in place to the smallest integer dtype (int8/int16).
+
+    Columns holding NaN or non-numeric values are left untouched.
+    """
+    for c in KEY_COLUMNS:
+        if c in df.columns and pd.api.types.is_integer_dtype(df[c]):
+            df[c] = pd.to_numeric(df[c], downcast='integer')
+    return df
+
+
+def categorize_codes(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert CATEGORY_COLUMNS in place to category dtype (int8 codes)."""
+    for c in CATEGORY_COLUMNS:
+        if c in df.columns and pd.api.types.is_object_dtype(df[c]):
+            df[c] = df[c].astype('category')
+    return df
+
+
+def _csv_key(path: Path) -> bytes:
+    """Size/mtime_ns fingerprint of a CSV, stored in the parquet copy made from it."""
+    st = path.stat()
+    return f"{st.st_size}-{st.st_mtime_ns}".encode()
+
+
+def read_table(path) -> pd.DataFrame:
+    """
+    Read a CSV table exactly as pd.read_csv would.
+
+    If a parquet copy written by write_table sits next to the CSV and was made
+    from the CSV as it is now (same size and mtime_ns, recorded in the parquet
+    metadata), it is read instead (keeps dtypes, no text parsing). Integer
+    key columns are downcast and driver/compound codes made categorical before
+    the frame is returned.
+    """
+    path = Path(path)
+    parquet = path.with_suffix(".parquet")
+    if parquet.exists() and (not path.exists()
+                             or (pq.read_schema(parquet).metadata or {}).get(PARQUET_KEY) == _csv_key(path)):
+        df = pd.read_parquet(parquet)
+    else:
+        # pandas' C parser rather than pyarrow: same float rounding and NaN
+        # (not None) for missing strings as every other reader of these files
+        df = pd.read_csv(path)
+    return categorize_codes(downcast_keys(df))
+
+
+def write_csv(df: pd.DataFrame, path) -> None:
+    """
+    Write df (without its index) as CSV in pandas' own format.
+
+    Final exports are read by users and other tools, so they keep
+    pandas.to_csv output (minimal quoting, True/False, 1.0) rather than
+    Arrow's CSV dialect.
+    """
+    df.to_csv(path, index=False)
+
+
+def write_table(df: pd.DataFrame, path) -> None:
+    """Write an intermediate table as CSV plus a zstd parquet copy keyed to that CSV for read_table."""
+    path = Path(path)
+    write_csv(df, path)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), PARQUET_KEY: _csv_key(path)})
+    pq.write_table(table, path.with_suffix(".parquet"), compression="zstd")